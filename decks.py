@@ -0,0 +1,82 @@
+"""
+A corpus of pre-shuffled decks, stored on disk as a single uint8 array with one row
+of card ids (see `utils.card_id`) per deck, in the order they are dealt.
+
+The corpus is a `.npy` file that is opened memory-mapped, so looking up a deck only
+reads its 50 bytes, and all worker processes playing from the same corpus share the
+operating system's cached copy of it. Experiments can then name the decks they were
+played on by their index in the corpus. To write a corpus of a million decks:
+
+    python decks.py decks.npy -n 1000000
+"""
+
+import argparse
+import functools
+import sys
+
+import numpy as np
+
+from utils import DECK_IDS, DECK_SIZE, Color, card_from_id
+
+
+def write_corpus(
+    path: str, count: int, seed: int | None = None, chunk_size: int = 100000
+) -> None:
+    """
+    Write a corpus of `count` decks shuffled with `seed` to `path`, `chunk_size`
+    decks at a time, so that the corpus never has to fit in memory.
+    """
+    rng = np.random.default_rng(seed)
+    decks = np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.uint8, shape=(count, DECK_SIZE)
+    )
+    for start in range(0, count, chunk_size):
+        n = min(chunk_size, count - start)
+        decks[start : start + n] = rng.permuted(np.tile(DECK_IDS, (n, 1)), axis=1)
+    decks.flush()
+
+
+class DeckCorpus:
+    """
+    A read-only, memory-mapped corpus of decks written by `write_corpus`.
+
+    `corpus[i]` is deck `i` as a list of cards, ready to be passed to `Game`, and
+    `corpus.ids[i : i + n]` the card ids of n decks, e.g. for `VectorGame.reset`.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.ids = np.load(path, mmap_mode="r")
+        if self.ids.ndim != 2 or self.ids.shape[1] != DECK_SIZE:
+            raise ValueError(f"{path} is not a corpus of {DECK_SIZE}-card decks")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> list[tuple[Color, int]]:
+        return [card_from_id(cid) for cid in self.ids[index].tolist()]
+
+
+@functools.cache
+def open_corpus(path: str) -> DeckCorpus:
+    """
+    The corpus at `path`, opened once per process.
+    """
+    return DeckCorpus(path)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Write a corpus of shuffled Hanabi decks to a .npy file."
+    )
+    parser.add_argument("path", help="the file to write, e.g. decks.npy")
+    parser.add_argument(
+        "-n", "--decks", type=int, default=1000000, help="number of decks to write"
+    )
+    parser.add_argument("--seed", type=int, help="seed for shuffling the decks")
+    options = parser.parse_args(argv)
+    write_corpus(options.path, options.decks, options.seed)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
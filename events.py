@@ -0,0 +1,187 @@
+"""
+Typed events emitted by the game engines, and the sinks that consume them.
+
+An engine builds an event only when its sink is `enabled`, so batch runs that use the
+default `NullEventSink` pay nothing for logging. `TextEventSink` renders events into
+the human-readable log that `Game` has always written; the rendering happens in the
+sink, not in the engine.
+"""
+
+import sys
+from typing import NamedTuple, Sequence, TextIO
+
+from utils import Action, Color, NullStream, format_card, format_hand
+
+type Card = tuple[Color, int]
+
+
+class GameStarted(NamedTuple):
+    deck: tuple[Card, ...]  # the cards left in the deck after dealing
+
+
+class MoveMade(NamedTuple):
+    player: int
+    action: Action
+
+
+class HintGiven(NamedTuple):
+    player: int
+    action: Action
+    hints: int  # hint tokens left after the hint
+    hand: tuple[Card, ...]  # the hand of the hinted player
+
+
+class CardPlayed(NamedTuple):
+    player: int
+    card: Card
+    success: bool
+    board: tuple[Card, ...]
+    hand: tuple[Card, ...]  # the hand of the player after drawing
+
+
+class CardDiscarded(NamedTuple):
+    player: int
+    card: Card
+    trash: tuple[Card, ...]
+    hand: tuple[Card, ...]  # the hand of the player after drawing
+
+
+class GameEnded(NamedTuple):
+    hits: int
+    score: int
+
+
+class PlayerMetrics(NamedTuple):
+    player: int
+    ipp: float | None  # None if the player never played or discarded
+    critical_discards: int
+    known_playable_discards: int
+
+
+type Event = (
+    GameStarted
+    | MoveMade
+    | HintGiven
+    | CardPlayed
+    | CardDiscarded
+    | GameEnded
+    | PlayerMetrics
+)
+
+
+class EventSink:
+    """
+    Receives the events of a game. Engines check `enabled` before building an event,
+    so a disabled sink is never called.
+    """
+
+    enabled: bool = True
+
+    def emit(self, event: Event) -> None:
+        raise NotImplementedError
+
+
+class NullEventSink(EventSink):
+    enabled = False
+
+    def emit(self, event: Event) -> None:
+        pass
+
+
+NULL_SINK = NullEventSink()
+
+
+class ListEventSink(EventSink):
+    """
+    Keeps every event in `events`, for replays and tests.
+    """
+
+    def __init__(self) -> None:
+        self.events: list[Event] = []
+
+    def emit(self, event: Event) -> None:
+        self.events.append(event)
+
+
+class TextEventSink(EventSink):
+    """
+    Writes events to `stream` as the text log of the game. `players` is used to look
+    up names when an event is rendered, so replacing a player mid-game (as the web UI
+    does on takeover) is reflected in the log. With `format` set, the deck and a
+    machine-readable "MOVE:" line are written as well.
+    """
+
+    def __init__(self, stream: TextIO, players: Sequence, format: int = 0) -> None:
+        self.stream = stream
+        self.players = players
+        self.format = format
+
+    def emit(self, event: Event) -> None:
+        out = self.stream
+        names = self.players
+        match event:
+            case GameStarted(deck):
+                if self.format:
+                    print(list(deck), file=out)
+            case MoveMade(player, action):
+                if self.format:
+                    print(
+                        "MOVE:",
+                        player,
+                        action.action_type,
+                        action.cnr,
+                        action.pnr,
+                        action.col,
+                        action.num,
+                        file=out,
+                    )
+            case HintGiven(player, action, hints, hand):
+                assert action.pnr is not None
+                if action.action_type == Action.ActionType.HINT_COLOR:
+                    assert action.col is not None
+                    about: tuple = (action.col.display_name, "cards")
+                else:
+                    about = (action.num,)
+                print(
+                    names[player].name,
+                    "hints",
+                    names[action.pnr].name,
+                    "about all their",
+                    *about,
+                    "hints remaining:",
+                    hints,
+                    file=out,
+                )
+                print(names[action.pnr].name, "has", format_hand(hand), file=out)
+            case CardPlayed(player, card, success, board, hand):
+                print(names[player].name, "plays", format_card(card), file=out)
+                if success:
+                    print("successfully! Board is now", format_hand(board), file=out)
+                else:
+                    print("and fails. Board was", format_hand(board), file=out)
+                print(names[player].name, "now has", format_hand(hand), file=out)
+            case CardDiscarded(player, card, trash, hand):
+                print(names[player].name, "discards", format_card(card), file=out)
+                print("trash is now", format_hand(trash), file=out)
+                print(names[player].name, "now has", format_hand(hand), file=out)
+            case GameEnded(hits, score):
+                print("Game done, hits left:", hits, file=out)
+                print("Points:", score, file=out)
+            case PlayerMetrics(player, ipp, critical, known_playable):
+                who = f"Player {player} ({names[player].name})"
+                if ipp is None:
+                    print(f"{who} IPP: n/a (did not play or discard card)", file=out)
+                else:
+                    print(f"{who} IPP: {ipp:.2f}", file=out)
+                print(f"{who} Critical Discards: {critical}", file=out)
+                print(f"{who} Known Playable Discards: {known_playable}", file=out)
+
+
+def make_sink(log=sys.stdout, players: Sequence = (), format: int = 0) -> EventSink:
+    """
+    The sink an engine uses when it is only given a log stream: nothing for a
+    `NullStream`, a text log for anything else.
+    """
+    if log is None or isinstance(log, NullStream):
+        return NULL_SINK
+    return TextEventSink(log, players, format)
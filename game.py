@@ -1,24 +1,53 @@
+import functools
+import random
 import sys
 from abc import ABCMeta, abstractmethod
-from typing import Sequence, override, Final, Any
+from typing import TYPE_CHECKING, Callable, NamedTuple, Sequence, override, Final, Any
 from collections import Counter
 
-import hana_sim  # type: ignore
-
-from players import Player, HanaSimPlayer
+import numpy as np
+
+from events import (
+    CardDiscarded,
+    CardPlayed,
+    EventSink,
+    GameEnded,
+    GameStarted,
+    HintGiven,
+    MoveMade,
+    PlayerMetrics,
+    make_sink,
+)
+from knowledge import (
+    COLOR_CELLS,
+    INITIAL_CARD_KNOWLEDGE,
+    NUM_COLORS,
+    NUM_RANKS,
+    RANK_CELLS,
+    KnowledgeTensor,
+)
+from players import Player
+from turn import TurnView
 from utils import (
+    GLOBAL_RNG,
     Action,
+    CardTracker,
     Color,
+    DECK_IDS,
+    DECK_SIZE,
+    board_ranks,
+    card_counts,
+    card_id,
     get_possible,
     make_deck,
-    initial_knowledge,
-    format_hand,
-    COUNTS,
-    format_card,
+    unseen_counts,
     MAX_HINT_TOKENS,
     playable
 )
 
+if TYPE_CHECKING:
+    import hana_sim  # type: ignore
+
 MAX_PLAYERS: Final[int] = 5
 MIN_PLAYERS: Final[int] = 2
 
@@ -39,13 +68,103 @@ COLOR_INT_CONVERSION_DICT = {  # converts Hanasim numbering into pyhanabi number
 COLOR_REVERSE_CONVERSION_DICT = {v: k for k, v in COLOR_INT_CONVERSION_DICT.items()}
 
 
+# the hints a player can receive: one for each color, then one for each rank
+HINTS_PER_PLAYER: Final[int] = NUM_COLORS + NUM_RANKS
+
+
+class ActionTable:
+    """
+    Every action a player can take in a game with a given number of players, laid
+    out as in `VectorGame`. `index` maps each action back to its position.
+    """
+
+    __slots__ = ("hand_size", "actions", "index")
+
+    def __init__(self, num_players: int) -> None:
+        self.hand_size = 5 if num_players < 4 else 4
+        actions = [
+            Action(Action.ActionType.PLAY, cnr=i) for i in range(self.hand_size)
+        ] + [Action(Action.ActionType.DISCARD, cnr=i) for i in range(self.hand_size)]
+        for pnr in range(num_players):
+            actions += [
+                Action(Action.ActionType.HINT_COLOR, pnr=pnr, col=col) for col in Color
+            ]
+            actions += [
+                Action(Action.ActionType.HINT_NUMBER, pnr=pnr, num=num)
+                for num in range(1, NUM_RANKS + 1)
+            ]
+        self.actions: tuple[Action, ...] = tuple(actions)
+        self.index: dict[Action, int] = {a: i for i, a in enumerate(self.actions)}
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+
+@functools.cache
+def action_table(num_players: int) -> ActionTable:
+    return ActionTable(num_players)
+
+
+class ActionSet(Sequence[Action]):
+    """
+    The valid actions of a turn: a sequence of actions from an `ActionTable`, in the
+    order the engine lists them, together with a bitmask over the table so that
+    membership is a single lookup.
+    """
+
+    __slots__ = ("table", "mask", "_actions")
+
+    def __init__(self, table: ActionTable, indices: Sequence[int]) -> None:
+        self.table = table
+        self._actions = tuple(table.actions[i] for i in indices)
+        mask = 0
+        for i in indices:
+            mask |= 1 << int(i)
+        self.mask = mask
+
+    @classmethod
+    def from_actions(cls, table: ActionTable, actions: Sequence[Action]) -> "ActionSet":
+        return cls(table, [table.index[a] for a in actions])
+
+    def __contains__(self, action) -> bool:
+        i = self.table.index.get(action)
+        return i is not None and (self.mask >> i) & 1 == 1
+
+    def __getitem__(self, i):
+        return self._actions[i]
+
+    def __len__(self) -> int:
+        return len(self._actions)
+
+    def __iter__(self):
+        return iter(self._actions)
+
+    def __repr__(self) -> str:
+        return f"ActionSet({[str(a) for a in self._actions]})"
+
+
 class AbstractGame(metaclass=ABCMeta):
     players: Sequence[Player]
+    # the dead colors, highest reachable score and critical cards given the trash
+    cards: CardTracker
 
     @abstractmethod
-    def __init__(self, players: Sequence[Player], log=sys.stdout):
+    def __init__(
+        self,
+        players: Sequence[Player],
+        log=sys.stdout,
+        events: EventSink | None = None,
+        rng: random.Random | None = None,
+    ):
         self.players = players
         self.log = log
+        # where the game reports what happens; defaults to a text log on `log`
+        self.events = events if events is not None else make_sink(log, players)
+        # the game's source of randomness, shared with its players; without one the
+        # game uses the shared GLOBAL_RNG
+        self.rng = rng if rng is not None else GLOBAL_RNG
+        for player in players:
+            player.rng = self.rng
 
     @abstractmethod
     def run(self, turns: int) -> int:
@@ -61,9 +180,9 @@ class AbstractGame(metaclass=ABCMeta):
 
 
 class HanasimGame(AbstractGame):
-    _env: hana_sim.HanabiEnv
-    _obs: hana_sim.Observation
-    knowledge: list[list[list[list[int]]]]
+    _env: "hana_sim.HanabiEnv"
+    _obs: "hana_sim.Observation"
+    knowledge: KnowledgeTensor
     _metric_dict: dict[str, Any]
 
     hanasim_colour_map: Final[dict[str, Color]] = {
@@ -75,11 +194,24 @@ class HanasimGame(AbstractGame):
     }
 
     @override
-    def __init__(self, players, log=sys.stdout, post_move_metrics: bool = False):
-        super().__init__(players, log)
+    def __init__(
+        self,
+        players,
+        log=sys.stdout,
+        post_move_metrics: bool = False,
+        events=None,
+        rng=None,
+    ):
+        # HanaSim is only imported to play on it, so the native engine works without it
+        import hana_sim  # type: ignore
+        from players import HanaSimPlayer
+
+        # HanaSim deals its own decks, so `rng` only drives the native players
+        super().__init__(players, log, events, rng)
         self._env = hana_sim.HanabiEnv(num_players=len(players))
         self._post_move_metrics = post_move_metrics
         self._metric_dict = {}
+        self.cards = CardTracker()
 
         for player in self.players:
             if isinstance(player, HanaSimPlayer):
@@ -89,6 +221,7 @@ class HanasimGame(AbstractGame):
 
     def _reset(self) -> None:
         self._obs = self._env.reset()
+        self.cards.reset()
         for p in self.players:
             p.reset()
 
@@ -96,13 +229,13 @@ class HanasimGame(AbstractGame):
         if len(self.players) < 4:
             hand_size = 5
 
-        self.knowledge = [
-            [initial_knowledge() for __ in range(hand_size)]
-            for _ in range(len(self.players))
-        ]
+        self.knowledge = KnowledgeTensor(len(self.players), hand_size, full=True)
+        self.turn = 1  # counted like Game.turn
 
     @override
     def run(self, turns=-1):
+        from players import HanaSimPlayer
+
         if not (MIN_PLAYERS <= len(self.players) <= MAX_PLAYERS):
             raise RuntimeError(
                 f"Number of players must be between {MIN_PLAYERS} and {MAX_PLAYERS}"
@@ -117,19 +250,25 @@ class HanasimGame(AbstractGame):
             known_playable_discards = Counter() # count of known playable discards per player
 
         while True:
+            self.turn += 1
             acting_player_id: int = self._obs.current_player_id
 
             if not isinstance(self.players[acting_player_id], HanaSimPlayer):
                 # Get action from current player based on game state
-                action = self.players[acting_player_id].get_action(
-                    acting_player_id,
-                    self._convert_hands(self._obs.hands, acting_player_id),
-                    self.knowledge,
-                    self._convert_trash(self._obs.discards),
-                    self._convert_played(self._obs.fireworks),
-                    self._convert_board(self._obs.fireworks),
-                    HanasimGame._convert_valid_actions(self._obs.legal_actions),
-                    self._obs.hint_tokens,
+                action = self.players[acting_player_id].act(
+                    TurnView(
+                        acting_player_id,
+                        self._convert_hands(self._obs.hands, acting_player_id),
+                        self.knowledge,
+                        self._convert_trash(self._obs.discards),
+                        self._convert_played(self._obs.fireworks),
+                        self._convert_board(self._obs.fireworks),
+                        ActionSet.from_actions(
+                            action_table(len(self.players)),
+                            HanasimGame._convert_valid_actions(self._obs.legal_actions),
+                        ),
+                        self._obs.hint_tokens,
+                    )
                 )
                 
                 step_result = self._env.step(self._convert_action(action))
@@ -150,6 +289,7 @@ class HanasimGame(AbstractGame):
                     ipp_list[acting_player_id].append(self._information_per_play(action, acting_player_id))
 
             self._obs = step_result.observation
+            self._track_discards()
             self._update_knowledge(
                 action,
                 acting_player_id,
@@ -159,18 +299,21 @@ class HanasimGame(AbstractGame):
             if step_result.done:
                 break
 
-        print("Game done, hits left:", self._obs.lives_remaining, file=self.log)
         points = self._score(self._convert_board(self._obs.fireworks))
-        print("Points:", points, file=self.log)
+        if self.events.enabled:
+            self.events.emit(GameEnded(self._obs.lives_remaining, points))
 
         if self._post_move_metrics:
-            for i in range(len(self.players)):
-                if len(ipp_list[i]) == 0:
-                    print(f"Player {i} ({self.players[i].name}) IPP: n/a (did not play or discard card)", file=self.log)
-                else:
-                    print(f"Player {i} ({self.players[i].name}) IPP: {sum(ipp_list[i]) / len(ipp_list[i]) if ipp_list[i] else 0:.2f}", file=self.log)
-                print(f"Player {i} ({self.players[i].name}) Critical Discards: {critical_discards[i]}", file=self.log)
-                print(f"Player {i} ({self.players[i].name}) Known Playable Discards: {known_playable_discards[i]}", file=self.log)
+            if self.events.enabled:
+                for i in range(len(self.players)):
+                    self.events.emit(
+                        PlayerMetrics(
+                            i,
+                            sum(ipp_list[i]) / len(ipp_list[i]) if ipp_list[i] else None,
+                            critical_discards[i],
+                            known_playable_discards[i],
+                        )
+                    )
 
             self._metric_dict["ipp_list"] = ipp_list
             self._metric_dict["critical_discards"] = critical_discards
@@ -178,6 +321,13 @@ class HanasimGame(AbstractGame):
 
         return points
 
+    def _track_discards(self) -> None:
+        """
+        Add the cards trashed by the last move to `self.cards`.
+        """
+        for card in self._obs.discards[len(self.cards) :]:
+            self.cards.trash(self._convert_card(card))
+
     def _update_knowledge(
         self, action: Action, acting_player: int, hands: list[list[NativeCard]]
     ) -> None:
@@ -188,45 +338,30 @@ class HanasimGame(AbstractGame):
             assert action.col is not None
             assert action.pnr is not None
 
-            # Given a hint for colour X,
-            # for every card in the hinted player's hand:
-            #     - if the card is positively identified, set all non-X cells in the knowledge to 0
-            #     - if the card is negatively identified, set all X cells in the knowledge to 0
-            for (col, rank), card_knowledge in zip(
-                hands[action.pnr], self.knowledge[action.pnr]
-            ):
-                if col == action.col:
-                    for i in range(len(card_knowledge)):
-                        if i != col:
-                            card_knowledge[i] = [0 for _ in range(len(card_knowledge))]
-                else:
-                    for i in range(len(card_knowledge[action.col])):
-                        card_knowledge[action.col][i] = 0
+            # Given a hint for colour X, every positively identified card can only be
+            # of colour X, and no negatively identified card can be of colour X
+            self.knowledge.hint_color(
+                action.pnr,
+                action.col,
+                [col == action.col for col, _ in hands[action.pnr]],
+            )
 
         elif action.action_type == Action.ActionType.HINT_NUMBER:
             assert action.num is not None
             assert action.pnr is not None
 
-            # Given a hint for rank N,
-            # for every card in the hinted player's hand:
-            #     - if the card is positively identified, set all non-N cells in the knowledge to 0
-            #     - if the card is negatively identified, set all N cells in the knowledge to 0
-            for (col, rank), card_knowledge in zip(
-                hands[action.pnr], self.knowledge[action.pnr]
-            ):
-                if rank == action.num:
-                    for k in card_knowledge:
-                        for i in range(len(COUNTS)):
-                            if i + 1 != rank:
-                                k[i] = 0
-                else:
-                    for k in card_knowledge:
-                        k[action.num - 1] = 0
+            # Given a hint for rank N, every positively identified card can only be
+            # of rank N, and no negatively identified card can be of rank N
+            self.knowledge.hint_rank(
+                action.pnr,
+                action.num,
+                [rank == action.num for _, rank in hands[action.pnr]],
+            )
 
         else:  # the action is either play or discard
             assert action.cnr is not None
-            del self.knowledge[acting_player][action.cnr]
-            self.knowledge[acting_player].append(initial_knowledge())  # draw a new card
+            self.knowledge.remove(acting_player, action.cnr)
+            self.knowledge.draw(acting_player)  # draw a new card
 
     def _convert_hands(
         self, hands: list[list[HanaSimCard]], curr_player: int
@@ -366,18 +501,24 @@ class HanasimGame(AbstractGame):
         Assume the player is a pyhanabi player or a hanasim agent.
         """
         if not self._obs.done():
-            action = self.players[self._obs.current_player_id].get_action(
-                self._obs.current_player_id,
-                self._convert_hands(self._obs.hands, self._obs.current_player_id),
-                self.knowledge,
-                self._convert_trash(self._obs.discard),
-                self._convert_played(self._obs.fireworks),
-                self._convert_board(self._obs.fireworks),
-                HanasimGame._convert_valid_actions(self._obs.legal_actions),
-                self._obs.hint_tokens,
+            action = self.players[self._obs.current_player_id].act(
+                TurnView(
+                    self._obs.current_player_id,
+                    self._convert_hands(self._obs.hands, self._obs.current_player_id),
+                    self.knowledge,
+                    self._convert_trash(self._obs.discard),
+                    self._convert_played(self._obs.fireworks),
+                    self._convert_board(self._obs.fireworks),
+                    ActionSet.from_actions(
+                        action_table(len(self.players)),
+                        HanasimGame._convert_valid_actions(self._obs.legal_actions),
+                    ),
+                    self._obs.hint_tokens,
+                )
             )
             acting_player_id: int = self._obs.current_player_id
             self._obs = self._env.step(self._convert_action(action))
+            self._track_discards()
             self._update_knowledge(
                 action,
                 acting_player_id,
@@ -392,6 +533,7 @@ class HanasimGame(AbstractGame):
         if not self._obs.done():
             acting_player_id: int = self._obs.current_player_id
             self._obs = self._env.step(self._convert_action(action))
+            self._track_discards()
             self._update_knowledge(
                 action,
                 acting_player_id,
@@ -412,24 +554,9 @@ class HanasimGame(AbstractGame):
             self._obs.hands[acting_player_id][action.cnr]
         )
 
-        # a 5 card is always critical
-        if num == 5:
-            return True
-
-        # Check how many instances of the card are in the discard pile
-        trash = self._convert_trash(self._obs.discards)
-        count = 0
-        for card in trash:
-            if card[0] == col and card[1] == num:
-                count += 1
-        
-        # Determine if discard is critical based on card number
-        if num == 1 and count == 2:
-            return True
-        if (num == 2 or num == 3 or num == 4) and count == 1:
-            return True
-        
-        return False
+        # a card is critical if it is the last copy that is not in the discard pile,
+        # e.g. any 5
+        return self.cards.is_critical((col, num))
     
     def _discarding_known_playable_card(self, action: Action, acting_player_id: int) -> bool:
         """
@@ -480,36 +607,87 @@ class HanasimGame(AbstractGame):
 
 
 
+class GameSnapshot(NamedTuple):
+    """
+    An immutable copy of the state of a `Game`, see `Game.snapshot`.
+    """
+
+    hits: int
+    hints: int
+    current_player: int
+    extra_turns: int
+    turn: int
+    board: tuple[NativeCard, ...]
+    played: tuple[NativeCard, ...]
+    trash: tuple[NativeCard, ...]
+    deck: tuple[NativeCard, ...]
+    hands: tuple[tuple[NativeCard, ...], ...]
+    knowledge: KnowledgeTensor
+
+
 class Game(AbstractGame):
+    _undo: list[tuple] | None
+
     @override
-    def __init__(self, players, log=sys.stdout, format=0):
-        super().__init__(players)
+    def __init__(
+        self,
+        players,
+        log=sys.stdout,
+        format=0,
+        track_undo=False,
+        events=None,
+        rng=None,
+        deck=None,
+    ):
+        if events is None:
+            events = make_sink(log, players, format)
+        super().__init__(players, log, events, rng)
+        # the changes made by each call to perform, most recent last, see undo()
+        self._undo = [] if track_undo else None
         self.hits = 3
         self.hints = MAX_HINT_TOKENS
         self.current_player = 0
         self.board = [(c, 0) for c in Color]
         self.played = []
-        self.deck = make_deck()
+        # the cards to deal, first card first; shuffled with `rng` unless given
+        self.deck = list(deck) if deck is not None else make_deck(self.rng)
         self.extra_turns = 0
         self.hands = []
-        self.knowledge = []
+        self.knowledge = KnowledgeTensor(len(players), self.hand_size())
         self.make_hands()
         self.trash = []
-        self.log = log
+        self.cards = CardTracker()
+        self._recount()
         self.turn = 1
         self.format = format
         self.dopostsurvey = False
         self.study = False
-        if self.format:
-            print(self.deck, file=self.log)
+        if self.events.enabled:
+            self.events.emit(GameStarted(tuple(self.deck)))
 
-    def make_hands(self):
-        handsize = 4
+    def _recount(self) -> None:
+        """
+        Rebuild the arrays that mirror the board, played and trash lists: the rank on
+        top of each color's stack, the number of copies of each card id, and the
+        number of copies of each card id that are still unseen, which the players
+        are given as `TurnView.unseen`. The card tracker is reset in place, as players
+        may hold on to it.
+        """
+        self.board_ranks = np.array(board_ranks(self.board), dtype=np.int8)
+        self.played_counts = np.array(card_counts(self.played), dtype=np.int8)
+        self.trash_counts = np.array(card_counts(self.trash), dtype=np.int8)
+        self.unseen_counts = unseen_counts(self.board, self.trash)
+        self.cards.reset(self.trash)
+
+    def hand_size(self) -> int:
         if len(self.players) < 4:
-            handsize = 5
+            return 5
+        return 4
+
+    def make_hands(self):
+        handsize = self.hand_size()
         for i, p in enumerate(self.players):
             self.hands.append([])
-            self.knowledge.append([])
             for j in list(range(handsize)):
                 self.draw_card(i)
 
@@ -519,156 +697,122 @@ class Game(AbstractGame):
         if not self.deck:
             return
         self.hands[pnr].append(self.deck[0])
-        self.knowledge[pnr].append(initial_knowledge())
+        self.knowledge.draw(pnr)
         del self.deck[0]
 
     def perform(self, action: Action):
+        if self._undo is not None:
+            self._undo.append(self._undo_record(action))
         for p in self.players:
             p.inform(action, self.current_player, self)
-        if self.format:
-            print(
-                "MOVE:",
-                self.current_player,
-                action.action_type,
-                action.cnr,
-                action.pnr,
-                action.col,
-                action.num,
-                file=self.log,
-            )
+        events = self.events if self.events.enabled else None
+        if events is not None:
+            events.emit(MoveMade(self.current_player, action))
         if action.action_type == Action.ActionType.HINT_COLOR:
             assert action.col is not None
             assert action.pnr is not None
 
             self.hints -= 1
-            print(
-                self.players[self.current_player].name,
-                "hints",
-                self.players[action.pnr].name,
-                "about all their",
-                action.col.display_name,
-                "cards",
-                "hints remaining:",
-                self.hints,
-                file=self.log,
-            )
-            print(
-                self.players[action.pnr].name,
-                "has",
-                format_hand(self.hands[action.pnr]),
-                file=self.log,
+            self.knowledge.hint_color(
+                action.pnr,
+                action.col,
+                [col == action.col for col, _ in self.hands[action.pnr]],
             )
-            for (col, num), knowledge in zip(
-                self.hands[action.pnr], self.knowledge[action.pnr]
-            ):
-                if col == action.col:
-                    for i, k in enumerate(knowledge):
-                        if i != col:
-                            for i in range(len(k)):
-                                k[i] = 0
-                else:
-                    for i in range(len(knowledge[action.col])):
-                        knowledge[action.col][i] = 0
+            if events is not None:
+                events.emit(
+                    HintGiven(
+                        self.current_player,
+                        action,
+                        self.hints,
+                        tuple(self.hands[action.pnr]),
+                    )
+                )
         elif action.action_type == Action.ActionType.HINT_NUMBER:
             assert action.num is not None
             assert action.pnr is not None
 
             self.hints -= 1
-            print(
-                self.players[self.current_player].name,
-                "hints",
-                self.players[action.pnr].name,
-                "about all their",
+            self.knowledge.hint_rank(
+                action.pnr,
                 action.num,
-                "hints remaining:",
-                self.hints,
-                file=self.log,
-            )
-            print(
-                self.players[action.pnr].name,
-                "has",
-                format_hand(self.hands[action.pnr]),
-                file=self.log,
+                [num == action.num for _, num in self.hands[action.pnr]],
             )
-            for (col, num), knowledge in zip(
-                self.hands[action.pnr], self.knowledge[action.pnr]
-            ):
-                if num == action.num:
-                    for k in knowledge:
-                        for i in range(len(COUNTS)):
-                            if i + 1 != num:
-                                k[i] = 0
-                else:
-                    for k in knowledge:
-                        k[action.num - 1] = 0
+            if events is not None:
+                events.emit(
+                    HintGiven(
+                        self.current_player,
+                        action,
+                        self.hints,
+                        tuple(self.hands[action.pnr]),
+                    )
+                )
         elif action.action_type == Action.ActionType.PLAY:
             (col, num) = self.hands[self.current_player][action.cnr]
-            print(
-                self.players[self.current_player].name,
-                "plays",
-                format_card((col, num)),
-                file=self.log,
-            )
-            if self.board[col][1] == num - 1:
+            success = bool(self.board_ranks[col] == num - 1)
+            self.unseen_counts[card_id((col, num))] -= 1
+            if success:
                 self.board[col] = (col, num)
+                self.board_ranks[col] = num
                 self.played.append((col, num))
+                self.played_counts[card_id((col, num))] += 1
                 if num == 5:
                     self.hints += 1
                     self.hints = min(self.hints, 8)
-                print(
-                    "successfully! Board is now", format_hand(self.board), file=self.log
-                )
             else:
                 self.trash.append((col, num))
+                self.trash_counts[card_id((col, num))] += 1
+                self.cards.trash((col, num))
                 self.hits -= 1
-                print("and fails. Board was", format_hand(self.board), file=self.log)
             del self.hands[self.current_player][action.cnr]
-            del self.knowledge[self.current_player][action.cnr]
+            self.knowledge.remove(self.current_player, action.cnr)
             self.draw_card()
-            print(
-                self.players[self.current_player].name,
-                "now has",
-                format_hand(self.hands[self.current_player]),
-                file=self.log,
-            )
+            if events is not None:
+                events.emit(
+                    CardPlayed(
+                        self.current_player,
+                        (col, num),
+                        success,
+                        tuple(self.board),
+                        tuple(self.hands[self.current_player]),
+                    )
+                )
         else:
             self.hints += 1
             self.hints = min(self.hints, 8)
-            self.trash.append(self.hands[self.current_player][action.cnr])
-            print(
-                self.players[self.current_player].name,
-                "discards",
-                format_card(self.hands[self.current_player][action.cnr]),
-                file=self.log,
-            )
-            print("trash is now", format_hand(self.trash), file=self.log)
+            card = self.hands[self.current_player][action.cnr]
+            self.trash.append(card)
+            self.trash_counts[card_id(card)] += 1
+            self.unseen_counts[card_id(card)] -= 1
+            self.cards.trash(card)
             del self.hands[self.current_player][action.cnr]
-            del self.knowledge[self.current_player][action.cnr]
+            self.knowledge.remove(self.current_player, action.cnr)
             self.draw_card()
-            print(
-                self.players[self.current_player].name,
-                "now has",
-                format_hand(self.hands[self.current_player]),
-                file=self.log,
-            )
+            if events is not None:
+                events.emit(
+                    CardDiscarded(
+                        self.current_player,
+                        card,
+                        tuple(self.trash),
+                        tuple(self.hands[self.current_player]),
+                    )
+                )
 
-    def valid_actions(self):
+    def valid_actions(self) -> ActionSet:
+        table = action_table(len(self.players))
+        h = table.hand_size
         valid = []
         for i in range(len(self.hands[self.current_player])):
-            valid.append(Action(Action.ActionType.PLAY, cnr=i))
-            valid.append(Action(Action.ActionType.DISCARD, cnr=i))
+            valid.append(i)  # play card i
+            valid.append(h + i)  # discard card i
         if self.hints > 0:
-            for i, p in enumerate(self.players):
+            for i in range(len(self.players)):
                 if i != self.current_player:
-                    for col in set(list(map(lambda x: x[0], self.hands[i]))):
-                        valid.append(
-                            Action(Action.ActionType.HINT_COLOR, pnr=i, col=col)
-                        )
-                    for num in set(list(map(lambda x: x[1], self.hands[i]))):
-                        valid.append(
-                            Action(Action.ActionType.HINT_NUMBER, pnr=i, num=num)
-                        )
-        return valid
+                    offset = 2 * h + i * HINTS_PER_PLAYER
+                    valid += sorted({offset + col for col, _ in self.hands[i]})
+                    valid += sorted(
+                        {offset + NUM_COLORS + num - 1 for _, num in self.hands[i]}
+                    )
+        return ActionSet(table, valid)
 
     @override
     def run(self, turns=-1):
@@ -676,31 +820,28 @@ class Game(AbstractGame):
             p.reset()
         self.turn = 1
         while not self.done() and (turns < 0 or self.turn < turns):
-            self.turn += 1
-            if not self.deck:
-                self.extra_turns += 1
             hands: list[list[NativeCard]] = []
             for i, h in enumerate(self.hands):
                 if i == self.current_player:
                     hands.append([])
                 else:
                     hands.append(h)
-            action = self.players[self.current_player].get_action(
-                self.current_player,
-                hands,
-                self.knowledge,
-                self.trash,
-                self.played,
-                self.board,
-                self.valid_actions(),
-                self.hints,
+            action = self.players[self.current_player].act(
+                TurnView(
+                    self.current_player,
+                    hands,
+                    self.knowledge,
+                    self.trash,
+                    self.played,
+                    self.board,
+                    self.valid_actions(),
+                    self.hints,
+                ).provide(unseen=self.unseen_counts)
             )
-            self.perform(action)
-            self.current_player += 1
-            self.current_player %= len(self.players)
-        print("Game done, hits left:", self.hits, file=self.log)
+            self._advance(action)
         points = self.score()
-        print("Points:", points, file=self.log)
+        if self.events.enabled:
+            self.events.emit(GameEnded(self.hits, points))
         return points
 
     def score(self):
@@ -709,36 +850,154 @@ class Game(AbstractGame):
     @override
     def single_turn(self):
         if not self.done():
-            if not self.deck:
-                self.extra_turns += 1
             hands: list[list[NativeCard]] = []
             for i, h in enumerate(self.hands):
                 if i == self.current_player:
                     hands.append([])
                 else:
                     hands.append(h)
-            action = self.players[self.current_player].get_action(
-                self.current_player,
-                hands,
-                self.knowledge,
-                self.trash,
-                self.played,
-                self.board,
-                self.valid_actions(),
-                self.hints,
+            action = self.players[self.current_player].act(
+                TurnView(
+                    self.current_player,
+                    hands,
+                    self.knowledge,
+                    self.trash,
+                    self.played,
+                    self.board,
+                    self.valid_actions(),
+                    self.hints,
+                ).provide(unseen=self.unseen_counts)
             )
-            self.perform(action)
-            self.current_player += 1
-            self.current_player %= len(self.players)
+            self._advance(action)
 
     @override
     def external_turn(self, action):
         if not self.done():
-            if not self.deck:
-                self.extra_turns += 1
-            self.perform(action)
-            self.current_player += 1
-            self.current_player %= len(self.players)
+            self._advance(action)
+
+    def _advance(self, action: Action) -> None:
+        """
+        Let the current player perform an action and pass the turn on.
+        """
+        # a turn that starts with an empty deck counts towards the end of the game
+        deck_empty = not self.deck
+        self.perform(action)
+        if deck_empty:
+            self.extra_turns += 1
+        self.current_player += 1
+        self.current_player %= len(self.players)
+        self.turn += 1
+
+    def _undo_record(self, action: Action) -> tuple:
+        state = (self.hits, self.hints, self.current_player, self.extra_turns, self.turn)
+        if action.action_type in {
+            Action.ActionType.HINT_COLOR,
+            Action.ActionType.HINT_NUMBER,
+        }:
+            return state, action, self.knowledge[action.pnr].copy()
+
+        card = self.hands[self.current_player][action.cnr]
+        (col, num) = card
+        success = (
+            action.action_type == Action.ActionType.PLAY
+            and self.board_ranks[col] == num - 1
+        )
+        return (
+            state,
+            action,
+            card,
+            self.knowledge[self.current_player][action.cnr].copy(),
+            success,
+            bool(self.deck),
+        )
+
+    def undo(self) -> None:
+        """
+        Roll the game back to the state before the most recent call to `perform`
+        (and the turn bookkeeping that followed it), in time proportional to what
+        that action changed. The game must have been created with `track_undo=True`.
+
+        Only the game is rolled back; the players have already been informed of the
+        action and keep whatever state they derived from it.
+        """
+        if not self._undo:
+            raise RuntimeError("There is no action to undo")
+        state, action, *changes = self._undo.pop()
+        (self.hits, self.hints, self.current_player, self.extra_turns, self.turn) = state
+
+        if action.action_type in {
+            Action.ActionType.HINT_COLOR,
+            Action.ActionType.HINT_NUMBER,
+        }:
+            (knowledge,) = changes
+            self.knowledge.assign(action.pnr, knowledge)
+            return
+
+        card, knowledge, success, drew = changes
+        hand = self.hands[self.current_player]
+        if drew:
+            self.deck.insert(0, hand.pop())
+            self.knowledge.remove(self.current_player, len(hand))
+        if success:
+            self.played.pop()
+            self.played_counts[card_id(card)] -= 1
+            (col, num) = card
+            self.board[col] = (col, num - 1)
+            self.board_ranks[col] = num - 1
+        else:
+            self.trash.pop()
+            self.trash_counts[card_id(card)] -= 1
+            self.cards.untrash(card)
+        self.unseen_counts[card_id(card)] += 1
+        hand.insert(action.cnr, card)
+        self.knowledge.insert(self.current_player, action.cnr, knowledge)
+
+    def snapshot(self) -> GameSnapshot:
+        """
+        Capture the state of the game (but not of its players) so it can be
+        restored later, e.g. to explore several continuations of the same position.
+
+        The knowledge is shared with the game until either changes it (see
+        `KnowledgeTensor.share`), while the cards are copied into tuples, in time
+        proportional to the 50 cards of the game. `undo` is cheaper when only the
+        last few actions need to be taken back.
+        """
+        return GameSnapshot(
+            hits=self.hits,
+            hints=self.hints,
+            current_player=self.current_player,
+            extra_turns=self.extra_turns,
+            turn=self.turn,
+            board=tuple(self.board),
+            played=tuple(self.played),
+            trash=tuple(self.trash),
+            deck=tuple(self.deck),
+            hands=tuple(tuple(hand) for hand in self.hands),
+            knowledge=self.knowledge.share(),
+        )
+
+    def restore(self, snapshot: GameSnapshot) -> None:
+        """
+        Reset the game to a state captured by `snapshot`. This discards the undo
+        history, which belongs to a different line of play.
+
+        Like `snapshot`, this shares the knowledge and copies the cards, so the same
+        snapshot can be restored any number of times.
+        """
+        self.hits = snapshot.hits
+        self.hints = snapshot.hints
+        self.current_player = snapshot.current_player
+        self.extra_turns = snapshot.extra_turns
+        self.turn = snapshot.turn
+        self.board = list(snapshot.board)
+        self.played = list(snapshot.played)
+        self.trash = list(snapshot.trash)
+        self.deck = list(snapshot.deck)
+        self.hands = [list(hand) for hand in snapshot.hands]
+        self.knowledge = snapshot.knowledge.share()
+        self._recount()
+        if self._undo is not None:
+            self._undo = []
 
     def done(self):
         if self.extra_turns == len(self.players) or self.hits == 0:
@@ -752,3 +1011,255 @@ class Game(AbstractGame):
         if self.format:
             print("Score", self.score(), file=self.log)
             self.log.close()
+
+
+# VectorGame identifies a card by its card id, color * NUM_RANKS + (rank - 1), and an
+# empty hand slot by -1
+
+
+class VectorObservation(NamedTuple):
+    """
+    The state of every game in a VectorGame, as seen by the player whose turn it is.
+    Each array has the number of games as its leading dimension.
+    """
+
+    current_player: np.ndarray
+    # card ids of every hand; the acting player's own cards are hidden as -1
+    hands: np.ndarray
+    knowledge: np.ndarray
+    # the rank on top of each color's stack
+    boards: np.ndarray
+    # the number of copies of each card id in the trash
+    trash: np.ndarray
+    hints: np.ndarray
+    hits: np.ndarray
+    deck_size: np.ndarray
+    legal_actions: np.ndarray
+
+
+class VectorGame:
+    """
+    Play many games with the same number of players in lockstep.
+
+    The games are stored as arrays whose leading dimension is the game, and `step`
+    applies one action to every unfinished game at once. The rules follow `Game`.
+
+    An action is an integer index into a fixed action space for the player count:
+    `[0, H)` play card i, `[H, 2H)` discard card i, and for every player p the ten
+    indices starting at `2H + 10p` hint p about one of the five colors and then one
+    of the five ranks (H is the hand size). Use `to_action` and `action_index` to
+    convert between indices and `Action` objects.
+    """
+
+    def __init__(self, num_games: int, num_players: int, seed=None):
+        if not (MIN_PLAYERS <= num_players <= MAX_PLAYERS):
+            raise RuntimeError(
+                f"Number of players must be between {MIN_PLAYERS} and {MAX_PLAYERS}"
+            )
+        self.num_games = num_games
+        self.num_players = num_players
+        self.hand_size = 5 if num_players < 4 else 4
+        self.num_actions = 2 * self.hand_size + HINTS_PER_PLAYER * num_players
+        self.rng = np.random.default_rng(seed)
+        self._games = np.arange(num_games)
+        self.reset()
+
+    def reset(self, decks=None) -> None:
+        """
+        Deal a new game in every slot, either from shuffled decks or from the given
+        (games, 50) array of card ids.
+        """
+        n, p, h = self.num_games, self.num_players, self.hand_size
+        if decks is None:
+            decks = self.rng.permuted(np.tile(DECK_IDS, (n, 1)), axis=1)
+        self.decks = np.array(decks, dtype=np.int8)
+        if self.decks.shape != (n, DECK_SIZE):
+            raise ValueError(f"Expected decks of shape {(n, DECK_SIZE)}")
+
+        self.hands = self.decks[:, : p * h].reshape(n, p, h).copy()
+        self.hand_sizes = np.full((n, p), h, dtype=np.int8)
+        self.deck_pos = np.full(n, p * h, dtype=np.int16)
+        self.knowledge = np.broadcast_to(
+            INITIAL_CARD_KNOWLEDGE, (n, p, h, NUM_COLORS, NUM_RANKS)
+        ).copy()
+        self.boards = np.zeros((n, NUM_COLORS), dtype=np.int8)
+        self.trash = np.zeros((n, NUM_COLORS * NUM_RANKS), dtype=np.int8)
+        self.hints = np.full(n, MAX_HINT_TOKENS, dtype=np.int8)
+        self.hits = np.full(n, 3, dtype=np.int8)
+        self.extra_turns = np.zeros(n, dtype=np.int8)
+        self.current_player = np.zeros(n, dtype=np.int8)
+        self.turns = np.zeros(n, dtype=np.int16)
+        self.done = np.zeros(n, dtype=bool)
+
+    def legal_actions(self) -> np.ndarray:
+        """
+        Return a (games, actions) boolean mask of the actions the current player of
+        each game may take. Finished games have no legal actions.
+        """
+        n, p, h = self.num_games, self.num_players, self.hand_size
+        legal = np.zeros((n, self.num_actions), dtype=bool)
+        has_card = self.hands[self._games, self.current_player] >= 0
+        legal[:, :h] = has_card
+        legal[:, h : 2 * h] = has_card
+
+        # like Game.valid_actions, only hints that touch at least one card are legal
+        present = self.hands >= 0
+        colors = np.where(present, self.hands // NUM_RANKS, -1)
+        ranks = np.where(present, self.hands % NUM_RANKS, -1)
+        hintable = np.concatenate(
+            [
+                (colors[..., None] == np.arange(NUM_COLORS)).any(axis=2),
+                (ranks[..., None] == np.arange(NUM_RANKS)).any(axis=2),
+            ],
+            axis=2,
+        )
+        may_hint = (self.hints > 0)[:, None] & (
+            np.arange(p)[None, :] != self.current_player[:, None]
+        )
+        hintable &= may_hint[..., None]
+        legal[:, 2 * h :] = hintable.reshape(n, p * HINTS_PER_PLAYER)
+
+        legal[self.done] = False
+        return legal
+
+    def observe(self) -> VectorObservation:
+        hands = self.hands.copy()
+        hands[self._games, self.current_player] = -1
+        return VectorObservation(
+            current_player=self.current_player.copy(),
+            hands=hands,
+            knowledge=self.knowledge.copy(),
+            boards=self.boards.copy(),
+            trash=self.trash.copy(),
+            hints=self.hints.copy(),
+            hits=self.hits.copy(),
+            deck_size=DECK_SIZE - self.deck_pos,
+            legal_actions=self.legal_actions(),
+        )
+
+    def step(self, actions) -> None:
+        """
+        Let the current player of every unfinished game perform the action with the
+        given index. Entries for finished games are ignored.
+        """
+        actions = np.asarray(actions)
+        games = np.nonzero(~self.done)[0]
+        if not len(games):
+            return
+        acts = actions[games]
+        if not self.legal_actions()[games, acts].all():
+            raise ValueError("Illegal action for at least one game")
+
+        h = self.hand_size
+        # as in Game, a turn taken with an empty deck counts towards the end
+        self.extra_turns[games] += self.deck_pos[games] >= DECK_SIZE
+
+        card_moves = acts < 2 * h
+        self._play_or_discard(
+            games[card_moves], acts[card_moves] % h, acts[card_moves] < h
+        )
+        hint_moves = ~card_moves
+        self._hint(games[hint_moves], acts[hint_moves] - 2 * h)
+
+        self.current_player[games] = (self.current_player[games] + 1) % (
+            self.num_players
+        )
+        self.turns[games] += 1
+        self.done[games] = (
+            (self.extra_turns[games] == self.num_players)
+            | (self.hits[games] == 0)
+            | (self.boards[games] == NUM_RANKS).all(axis=1)
+        )
+
+    def _play_or_discard(
+        self, games: np.ndarray, slots: np.ndarray, plays: np.ndarray
+    ) -> None:
+        h = self.hand_size
+        players = self.current_player[games]
+        cards = self.hands[games, players, slots]
+        cols = cards // NUM_RANKS
+        ranks = cards % NUM_RANKS + 1
+
+        success = plays & (self.boards[games, cols] == ranks - 1)
+        self.boards[games[success], cols[success]] = ranks[success]
+        regain = (~plays) | (success & (ranks == NUM_RANKS))
+        self.hints[games[regain]] = np.minimum(
+            self.hints[games[regain]] + 1, MAX_HINT_TOKENS
+        )
+        self.hits[games[plays & ~success]] -= 1
+        self.trash[games[~success], cards[~success]] += 1
+
+        # close the gap left by the card, then draw into the first empty slot
+        positions = np.arange(h)[None, :]
+        source = np.minimum(positions + (positions >= slots[:, None]), h - 1)
+        hands = np.take_along_axis(self.hands[games, players], source, axis=1)
+        knowledge = np.take_along_axis(
+            self.knowledge[games, players], source[..., None, None], axis=1
+        )
+        hands[:, h - 1] = -1
+
+        sizes = self.hand_sizes[games, players] - 1
+        draws = self.deck_pos[games] < DECK_SIZE
+        drawn = np.nonzero(draws)[0]
+        hands[drawn, sizes[drawn]] = self.decks[
+            games[drawn], self.deck_pos[games[drawn]]
+        ]
+        knowledge[drawn, sizes[drawn]] = INITIAL_CARD_KNOWLEDGE
+
+        self.hand_sizes[games, players] = sizes + draws
+        self.deck_pos[games] += draws
+        self.hands[games, players] = hands
+        self.knowledge[games, players] = knowledge
+
+    def _hint(self, games: np.ndarray, hints: np.ndarray) -> None:
+        targets = hints // HINTS_PER_PLAYER
+        values = hints % HINTS_PER_PLAYER
+        by_color = values < NUM_COLORS
+        values %= NUM_COLORS
+
+        self.hints[games] -= 1
+        hands = self.hands[games, targets]
+        present = hands >= 0
+        positive = np.where(
+            by_color[:, None],
+            present & (hands // NUM_RANKS == values[:, None]),
+            present & (hands % NUM_RANKS == values[:, None]),
+        )
+        cells = np.where(
+            by_color[:, None, None], COLOR_CELLS[values], RANK_CELLS[values]
+        )[:, None]
+        self.knowledge[games, targets] *= np.where(
+            positive[..., None, None], cells, ~cells
+        )
+
+    def score(self) -> np.ndarray:
+        return self.boards.sum(axis=1)
+
+    def run(self, policy: Callable[[VectorObservation], np.ndarray]) -> np.ndarray:
+        """
+        Play every game to the end, asking `policy` for one action index per game
+        each step, and return the scores.
+        """
+        while not self.done.all():
+            self.step(policy(self.observe()))
+        return self.score()
+
+    def to_action(self, index: int) -> Action:
+        return action_table(self.num_players).actions[index]
+
+    def action_index(self, action: Action) -> int:
+        return action_table(self.num_players).index[action]
+
+
+def uniform_random_policy(seed=None) -> Callable[[VectorObservation], np.ndarray]:
+    """
+    A VectorGame policy that picks uniformly among the legal actions of every game,
+    the vectorized counterpart of the base `Player`.
+    """
+    rng = np.random.default_rng(seed)
+
+    def policy(observation: VectorObservation) -> np.ndarray:
+        weights = rng.random(observation.legal_actions.shape)
+        return np.argmax(np.where(observation.legal_actions, weights, -1), axis=1)
+
+    return policy
@@ -1,66 +1,62 @@
+import argparse
+import contextlib
+import itertools
 import random
 import sys
 import time
-from typing import Any
+from typing import TYPE_CHECKING, Iterable, Sequence, cast
 import numpy
 
 from hana_sim import PlayerName  # type: ignore
 
+from decks import open_corpus
 from game import HanasimGame
-from players import (
-    Player,
-    SelfIntentionalPlayerWithMemory,
-    InnerStatePlayer,
-    OuterStatePlayer,
-    SelfRecognitionPlayer,
-    IntentionalPlayer,
-    SelfIntentionalPlayer,
-    SelfIntentionalPlayerDetectDeadColors,
-    SamplingRecognitionPlayer,
-    TimedPlayer,
-    LLMAgentPlayer,
-)
+from players import Player
 from players.hanasim import HanaSimPlayer
+from players.registry import PLAYER_TYPES
+import stats
+from runner import ENGINES, GameResult, iter_games, run_sequential, seed_scores
+from store import ResultStore
+from tournament import cross_play, format_matrix
 from utils import NullStream
 
+if TYPE_CHECKING:
+    from players import SamplingRecognitionPlayer, SelfRecognitionPlayer
+
 random.seed(123)
 
-player_types = {
-    "random": Player,
-    "inner": InnerStatePlayer,
-    "outer": OuterStatePlayer,
-    "self": SelfRecognitionPlayer,
-    "intentional": IntentionalPlayer,
-    "sample": SamplingRecognitionPlayer,
-    "full": SelfIntentionalPlayer,
-    "timed": TimedPlayer,
-    "full-with-mem": SelfIntentionalPlayerWithMemory,
-    "full-detect-dead": SelfIntentionalPlayerDetectDeadColors,
-    "llm": LLMAgentPlayer,
-}
 names = ["Shangdi", "Yu Di", "Tian", "Nu Wa", "Pangu"]
 
 
 def make_player(player_type: str, player_id: int) -> Player:
-    if player_type in player_types:
-        return player_types[player_type](names[player_id], player_id)
+    if player_type in PLAYER_TYPES:
+        return PLAYER_TYPES[player_type](names[player_id], player_id)
 
     elif player_type.startswith("self("):
+        # looked up in the registry, so that the module is only imported when used
+        self_player = cast("type[SelfRecognitionPlayer]", PLAYER_TYPES["self"])
         other = player_type[5:-1]
-        return SelfRecognitionPlayer(names[player_id], player_id, player_types[other])
+        if "," in other:
+            othername_raw, workers_raw = other.split(",")
+            return self_player(
+                names[player_id],
+                player_id,
+                PLAYER_TYPES[othername_raw.strip()],
+                workers=int(workers_raw.strip()),
+            )
+        return self_player(names[player_id], player_id, PLAYER_TYPES[other])
 
     elif player_type.startswith("sample("):
+        sample_player = cast("type[SamplingRecognitionPlayer]", PLAYER_TYPES["sample"])
         other = player_type[7:-1]
         if "," in other:
             othername_raw, maxtime_raw = other.split(",")
             othername = othername_raw.strip()
             maxtime = int(maxtime_raw.strip())
-            return SamplingRecognitionPlayer(
-                names[player_id], player_id, player_types[othername], maxtime=maxtime
+            return sample_player(
+                names[player_id], player_id, PLAYER_TYPES[othername], maxtime=maxtime
             )
-        return SamplingRecognitionPlayer(
-            names[player_id], player_id, player_types[other]
-        )
+        return sample_player(names[player_id], player_id, PLAYER_TYPES[other])
 
     else:
         # try to find a matching HanaSim player name
@@ -75,10 +71,138 @@ def make_player(player_type: str, player_id: int) -> Player:
         raise ValueError(f"Unknown player type: {player_type}")
 
 
-def main(args):
-    post_move_metrics = False
-    if not args:
-        args = ["random"] * 3
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Simulate games of Hanabi between AIs and report their scores."
+    )
+    parser.add_argument(
+        "players",
+        nargs="*",
+        default=["random"] * 3,
+        help="one spec per player (see make_player), or 'trial <count>'",
+    )
+    parser.add_argument(
+        "-n", "--games", type=int, default=10000, help="number of games to play"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of worker processes to play the games in",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        help="the game engine: HanaSim, or this package's Game (the default with "
+        "--cross-play, HanaSim otherwise)",
+    )
+    parser.add_argument(
+        "--decks",
+        metavar="PATH",
+        help="deal game n the deck with index n - 1 of this deck corpus (see "
+        "decks.py) instead of a deck shuffled with seed n (native engine only)",
+    )
+    parser.add_argument(
+        "--results",
+        metavar="PATH",
+        help="append the result of every game to this JSON Lines file",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip the games that already have a result in the --results file",
+    )
+    parser.add_argument(
+        "--precision",
+        type=float,
+        metavar="H",
+        help="play games in batches until the 95%% confidence interval of the "
+        "average score (or of the difference to --against) is at most ±H; -n is "
+        "then the maximum number of games",
+    )
+    parser.add_argument(
+        "--against",
+        nargs="+",
+        metavar="SPEC",
+        help="with --precision, a second set of players to compare against",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="number of games per batch with --precision",
+    )
+    parser.add_argument(
+        "--paired",
+        action="store_true",
+        help="with --against, compare the score differences on each deck rather "
+        "than the two averages (native engine only)",
+    )
+    parser.add_argument(
+        "--antithetic",
+        action="store_true",
+        help="with --precision, also play every deck in reverse order and average "
+        "the two scores (native engine only). The scores of a deck and its reverse "
+        "are hardly correlated, so this reduces the variance about as much as "
+        "playing twice as many decks, at the same cost",
+    )
+    parser.add_argument(
+        "--cross-play",
+        action="store_true",
+        help="play every pair of the given AIs on the same decks and print the "
+        "matrix of their scores",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="collect and report post-move metrics (HanaSim only)",
+    )
+    options = parser.parse_args(argv)
+    if options.cross_play and options.engine == "hanasim":
+        parser.error("--cross-play requires --engine native, as HanaSim deals its own decks")
+    if options.engine is None:
+        options.engine = "native" if options.cross_play else "hanasim"
+    if options.resume and not options.results:
+        parser.error("--resume requires --results")
+    if options.resume and options.precision is not None:
+        parser.error("--resume cannot be combined with --precision")
+    if options.against and options.precision is None:
+        parser.error("--against requires --precision")
+    if options.paired and not options.against:
+        parser.error("--paired requires --against")
+    if options.antithetic and options.precision is None:
+        parser.error("--antithetic requires --precision")
+    if (options.paired or options.antithetic) and options.engine != "native":
+        parser.error("--paired and --antithetic require --engine native")
+    if options.decks and options.engine != "native":
+        parser.error("--decks requires --engine native")
+    if options.metrics and options.engine != "hanasim":
+        parser.error("--metrics requires --engine hanasim")
+    if options.decks:
+        # opened once per process, so the runner gets the same corpus
+        corpus = open_corpus(options.decks)
+        if len(corpus) < options.games:
+            parser.error(
+                f"{options.decks} has {len(corpus)} decks, "
+                f"fewer than the {options.games} games to play"
+            )
+    return options
+
+
+def main(argv):
+    options = parse_args(argv)
+    args = options.players
+    post_move_metrics = options.metrics
+    if options.cross_play:
+        summaries = cross_play(
+            args,
+            range(1, options.games + 1),
+            workers=options.workers,
+            engine=options.engine,
+            decks=options.decks,
+        )
+        print(format_matrix(args, summaries))
+        return
     if args[0] == "trial":
         treatments = [
             ["intentional", "intentional"],
@@ -97,13 +221,15 @@ def main(args):
 
             print("trial", i + 1)
             for t in treatments:
-                random.seed(i)
+                rng = random.Random(i)
                 trial_players = []
                 for j, player in enumerate(t):
                     trial_players.append(make_player(player, j))
                 # TODO: change back or add flag
-                # g = Game(trial_players, NullStream())
-                g = HanasimGame(trial_players, NullStream(), post_move_metrics)
+                # g = Game(trial_players, NullStream(), rng=rng)
+                g = HanasimGame(
+                    trial_players, NullStream(), post_move_metrics, rng=rng
+                )
 
                 
 
@@ -159,70 +285,130 @@ def main(args):
 
         return
 
-    players: list[Player] = []
-
-    for i, a in enumerate(args):
-        players.append(make_player(a, i))
-
-    n = 10000
+    n = options.games
+    seeds = range(1, n + 1)
+
+    def report(done):
+        if done % 100 == 0 or options.workers > 1:
+            print("Finished", done, "of", len(todo), "games")
+
+    with contextlib.ExitStack() as stack:
+        todo: Sequence[int] = seeds
+        previous: Iterable[GameResult] = []
+        store = None
+        if options.results:
+            store = stack.enter_context(ResultStore(options.results))
+            if options.resume:
+                done = store.seeds(args, options.engine, options.decks)
+                todo = [seed for seed in seeds if seed not in done]
+                # read back as the summary gets to them, so they are never all in memory
+                previous = store.results(
+                    args, options.engine, seeds, decks=options.decks
+                )
+                print("Resuming with", n - len(todo), "of", n, "games already played")
+
+        if options.precision is not None:
+            treatments = [args]
+            if options.against:
+                treatments.append(options.against)
+
+            def report_batch(summaries):
+                print("After", summaries[0].n, "games:", *map(str, summaries))
+
+            played = run_sequential(
+                treatments,
+                seeds,
+                options.precision,
+                batch_size=options.batch_size,
+                workers=options.workers,
+                engine=options.engine,
+                post_move_metrics=post_move_metrics,
+                paired=options.paired,
+                antithetic=options.antithetic,
+                decks=options.decks,
+                record=store.append if store is not None else None,
+                progress=report_batch,
+            )
+            for specs, treatment_results in zip(treatments, played):
+                print("players:", *specs)
+                summarize(treatment_results, len(specs), post_move_metrics)
+            if len(played) == 2:
+                # per seed, so that the reversed decks of antithetic runs are
+                # averaged in rather than counted as games of their own
+                a_scores, b_scores = (seed_scores(rs) for rs in played)
+                a, b = (stats.summarize(s.values()) for s in (a_scores, b_scores))
+                print("difference:", stats.difference(a, b))
+                if options.paired:
+                    paired = stats.summarize(
+                        a_scores[seed] - b_scores[seed] for seed in a_scores
+                    )
+                    print("paired difference:", paired)
+            return
+
+        results = iter_games(
+            args,
+            todo,
+            workers=options.workers,
+            engine=options.engine,
+            post_move_metrics=post_move_metrics,
+            verbose=n < 3,
+            progress=report,
+            decks=options.decks,
+        )
+        if store is not None:
+            results = store.record(results)
+        summarize(itertools.chain(previous, results), len(args), post_move_metrics)
 
-    out: Any = NullStream()
-    if n < 3:
-        out = sys.stdout
 
+def summarize(results: Iterable[GameResult], num_players, post_move_metrics):
+    """
+    Print the score statistics of `results`, consuming them one at a time so that
+    only the scores are kept in memory.
+    """
     pts = []
-    ipp_lists = []
-    critical_discards = []
-    known_discards = []
-    for i in list(range(n)):
-        if (i + 1) % 100 == 0:
-            print("Starting game", i + 1)
-        random.seed(i + 1)
-        # TODO: change back or add flag
-        # g = Game(players, out)
-        g = HanasimGame(players, out, post_move_metrics)
-        pts.append(g.run())
-        
-        if post_move_metrics:
-            metrics = g.metric_dict
-            ipp_lists.append(metrics["ipp_list"])
-            critical_discards.append(metrics["critical_discards"])
-            known_discards.append(metrics["known_discards"])
-
-    if n < 10:
+    metric_games = 0
+    total_valid_ipp = [0] * num_players
+    sum_ipp = [0.0] * num_players
+    critical_discards = [0] * num_players
+    known_discards = [0] * num_players
+    for result in results:
+        pts.append(result.score)
+        if post_move_metrics and result.metrics is not None:
+            metric_games += 1
+            for i in range(num_players):
+                if len(result.metrics["ipp_list"][i]) > 0:
+                    total_valid_ipp[i] += 1
+                    sum_ipp[i] += numpy.mean(result.metrics["ipp_list"][i])
+                critical_discards[i] += result.metrics["critical_discards"][i]
+                known_discards[i] += result.metrics["known_discards"][i]
+
+    if len(pts) < 10:
         print(pts)
 
     print("average:", numpy.mean(pts))
     print("stddev:", numpy.std(pts, ddof=1))
     print("range", min(pts), max(pts))
 
-    if post_move_metrics:
-        for i in range(len(players)):
-
-            total_valid_ipp = 0
-            sum_ipp = 0
-            for j in range(n):
-                if  len(ipp_lists[j][i]) > 0:
-                    total_valid_ipp += 1
-                    sum_ipp += numpy.mean(ipp_lists[j][i])
-
-            avg_ipp = sum_ipp / total_valid_ipp if total_valid_ipp > 0 else None
+    if post_move_metrics and not metric_games:
+        print("No post-move metrics were collected")
+    elif post_move_metrics:
+        n = metric_games
+        for i in range(num_players):
+            avg_ipp = None
+            if total_valid_ipp[i] > 0:
+                avg_ipp = sum_ipp[i] / total_valid_ipp[i]
 
-            avg_critical_discards = sum(
-                critical_discards[j][i] for j in range(n)
-            ) / n
+            avg_critical_discards = critical_discards[i] / n
 
-            avg_known_discards = sum(
-                known_discards[j][i] for j in range(n)
-            ) / n
+            avg_known_discards = known_discards[i] / n
 
             if avg_ipp is None:
-                print(f"IPP for Player {players[i].pnr}: No valid data")
+                print(f"IPP for Player {i}: No valid data")
             else:
-                print(f"Average valid IPP count for Player {players[i].pnr}: {total_valid_ipp} out of {n}")
-                print(f"IPP for Player {players[i].pnr}: {avg_ipp}")
-            print(f"Average critical discards for {players[i].pnr}: {avg_critical_discards}")
-            print(f"Average known discards for {players[i].pnr}: {avg_known_discards}")
+                print(f"Average valid IPP count for Player {i}: {total_valid_ipp[i]} out of {n}")
+                print(f"IPP for Player {i}: {avg_ipp}")
+            print(f"Average critical discards for {i}: {avg_critical_discards}")
+            print(f"Average known discards for {i}: {avg_known_discards}")
 
 if __name__ == "__main__":
     main(sys.argv[1:])
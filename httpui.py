@@ -18,16 +18,8 @@ from urllib.parse import parse_qs
 from utils import Action, Color, format_card, NullStream
 from game import Game
 
-from players import (
-    Player,
-    SelfIntentionalPlayerWithMemory,
-    InnerStatePlayer,
-    OuterStatePlayer,
-    SelfRecognitionPlayer,
-    IntentionalPlayer,
-    SelfIntentionalPlayer,
-    SelfIntentionalPlayerDetectDeadColors,
-)
+from players import Player
+from players.registry import PLAYER_TYPES, WEB_PLAYERS
 
 from serverconf import HOST_NAME, PORT_NUMBER
 
@@ -652,19 +644,6 @@ def format_score(sc):
     return "%d points" % sc
 
 
-# AIClasses
-ais = {
-    "random": Player,
-    "inner": InnerStatePlayer,
-    "outer": OuterStatePlayer,
-    "self": SelfRecognitionPlayer,
-    "intentional": IntentionalPlayer,
-    "full": SelfIntentionalPlayer,
-    "full-with-mem": SelfIntentionalPlayerWithMemory,
-    "full-detect-dead": SelfIntentionalPlayerDetectDeadColors,
-}
-
-
 class MyHandler(BaseHTTPRequestHandler):
     def do_HEAD(s):
         s.send_response(200)
@@ -814,15 +793,14 @@ class MyHandler(BaseHTTPRequestHandler):
             nr = random.randint(6, 10000)
             type = t[0]
             t = (type, nr)
-            if type in ais:
-                ai = ais[type](type, 0)
+            if type in WEB_PLAYERS:
+                ai = PLAYER_TYPES[type](type, 0)
             turn = 1
             player = HTTPPlayer("You", 1)
             log = open("log/game%s.log" % gid, "w")
             print("Old GID:", oldgid, file=log)
             print("Treatment:", t, file=log)
-            random.seed(nr)
-            game = Game([ai, player], log=log, format=1)
+            game = Game([ai, player], log=log, format=1, rng=random.Random(nr))
             game.treatment = t
             game.ping = time.time()
             game.started = False
@@ -839,8 +817,8 @@ class MyHandler(BaseHTTPRequestHandler):
 
         elif path.startswith("/new/") and debug:
             type = s.path[5:]
-            if type in ais:
-                ai = ais[type](type, 0)
+            if type in WEB_PLAYERS:
+                ai = PLAYER_TYPES[type](type, 0)
             turn = 1
             player = HTTPPlayer("You", 1)
             nr = random.randint(6, 10000)
@@ -902,7 +880,9 @@ class MyHandler(BaseHTTPRequestHandler):
                     try:
                         items = line.strip().split()
                         ai = items[-2].strip("'(,")
-                        players[0].realplayer = ais[ai](ai, 0)
+                        if ai not in WEB_PLAYERS:
+                            raise ValueError(f"{ai} is not an AI of the web UI")
+                        players[0].realplayer = PLAYER_TYPES[ai](ai, 0)
                         deck = int(items[-1].strip(")"))
 
                     except Exception:
@@ -927,8 +907,10 @@ class MyHandler(BaseHTTPRequestHandler):
                 s.wfile.write(b"</body></html>")
                 return
             player = players[1]
-            random.seed(deck)
-            game = Game(players, log=NullStream())
+            game = Game(players, log=NullStream(), rng=random.Random(deck))
+            # the AI behind the replayed moves draws from the game's rng too
+            if players[0].realplayer:
+                players[0].realplayer.rng = game.rng
             game.started = time.time()
             for i in range(round):
                 game.single_turn()
@@ -942,6 +924,11 @@ class MyHandler(BaseHTTPRequestHandler):
                 s.wfile.write(b"</body></html>")
                 return
             gid, round, ai, action, arg = items[1:]
+            if ai not in WEB_PLAYERS:
+                s.wfile.write(b"<html><head><title>Hanabi</title></head>\n")
+                s.wfile.write(b"<body><h1>Invalid AI</h1>\n")
+                s.wfile.write(b"</body></html>")
+                return
             oldgid = gid
             fname = "log/game%s.log" % gid
             try:
@@ -960,7 +947,7 @@ class MyHandler(BaseHTTPRequestHandler):
             info = get_replay_info(fname)
             f = open(fname)
             players = [ReplayPlayer(ai.capitalize(), 0), ReplayHTTPPlayer("You", 1)]
-            players[0].realplayer = ais[ai](ai.capitalize(), 0)
+            players[0].realplayer = PLAYER_TYPES[ai](ai.capitalize(), 0)
             i = 0
 
             def convert(s):
@@ -995,13 +982,14 @@ class MyHandler(BaseHTTPRequestHandler):
                 s.wfile.write(b"</body></html>")
                 return
             player = players[1]
-            random.seed(deck)
             gid = s.getgid()
             t = (ai, deck)
             log = open("log/game%s.log" % gid, "w")
             print("Original:", oldgid, file=log)
             print("Treatment:", t, file=log)
-            game = Game(players, log=log, format=1)
+            game = Game(players, log=log, format=1, rng=random.Random(deck))
+            # the AI that takes over draws from the game's rng, before and after
+            players[0].realplayer.rng = game.rng
             game.treatment = t
             game.ping = time.time()
             game.started = True
@@ -1183,7 +1171,7 @@ class MyHandler(BaseHTTPRequestHandler):
                 f'<p>You may choose to use the same AI as the player that was playing the game by clicking <a href="/starttakeover/{gid}/{round + 1}/{ai}/{action}/{arg}">here</a></p>\n'.encode()
             )
             s.wfile.write(b"<p>You may also choose any AI to play with:</p><ul>")
-            for a in ais:
+            for a in WEB_PLAYERS:
                 s.wfile.write(
                     f'<li><a href="/starttakeover/{gid}/{round + 1}/{a}/{action}/{arg}">{a.capitalize()} AI</a></li>'.encode()
                 )
@@ -1204,7 +1192,7 @@ class MyHandler(BaseHTTPRequestHandler):
                 del games[gid]
             gameslock.release()
             # AIList
-            # /new/<foo> will look up <foo> in the ais dictionary, so make sure the names match
+            # /new/<foo> will look up <foo> in WEB_PLAYERS, so make sure the names match
             s.wfile.write(b"<html><head><title>Hanabi</title></head>\n")
             s.wfile.write(
                 b"<body><h1>Welcome to Hanabi</h1> <p>To start, choose an AI:</p>\n"
@@ -1587,14 +1575,13 @@ class MyHandler(BaseHTTPRequestHandler):
             random.seed(None)
             t = random.choice(treatments)
             type = t[0]
-            if type in ais:
-                ai = ais[type](type, 0)
+            if type in WEB_PLAYERS:
+                ai = PLAYER_TYPES[type](type, 0)
             turn = 1
             player = HTTPPlayer("You", 1)
             log = open("log/game%s.log" % gid, "w")
             print("Treatment:", t, file=log)
-            random.seed(t[1])
-            game = Game([ai, player], log=log, format=1)
+            game = Game([ai, player], log=log, format=1, rng=random.Random(t[1]))
             game.treatment = t
             game.ping = time.time()
             game.dopostsurvey = True
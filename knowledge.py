@@ -0,0 +1,149 @@
+from typing import overload
+
+import numpy as np
+
+from utils import COUNTS, Color
+
+NUM_COLORS = len(Color)
+NUM_RANKS = len(COUNTS)
+
+# the knowledge of a card nobody has been hinted about yet
+INITIAL_CARD_KNOWLEDGE = np.tile(np.array(COUNTS, dtype=np.int8), (NUM_COLORS, 1))
+INITIAL_CARD_KNOWLEDGE.flags.writeable = False
+
+# COLOR_CELLS[c] selects the cells of color c, RANK_CELLS[r] those of 0-based rank r
+COLOR_CELLS = np.zeros((NUM_COLORS, NUM_COLORS, NUM_RANKS), dtype=bool)
+RANK_CELLS = np.zeros((NUM_RANKS, NUM_COLORS, NUM_RANKS), dtype=bool)
+for _c in range(NUM_COLORS):
+    COLOR_CELLS[_c, _c, :] = True
+for _r in range(NUM_RANKS):
+    RANK_CELLS[_r, :, _r] = True
+COLOR_CELLS.flags.writeable = False
+RANK_CELLS.flags.writeable = False
+
+
+class KnowledgeTensor:
+    """
+    The knowledge of every player about every card in their hand, stored as a single
+    int8 array of shape (players, hand size, colors, ranks).
+
+    Indexing a tensor with a player number returns a (cards, colors, ranks) view of
+    that player's knowledge, so the nested `knowledge[p][c][col][rank]` access used
+    by the players keeps working. Slots past the current hand size are preallocated
+    and reused when a card is drawn.
+
+    A tensor made by `share` uses the same array as the original until either of them
+    changes, so the array is read-only while it is shared.
+    """
+
+    __slots__ = ("_cells", "_sizes")
+
+    def __init__(self, num_players: int, hand_size: int, full: bool = False) -> None:
+        self._cells = np.zeros(
+            (num_players, hand_size, NUM_COLORS, NUM_RANKS), dtype=np.int8
+        )
+        self._sizes = [0] * num_players
+        if full:
+            for pnr in range(num_players):
+                for _ in range(hand_size):
+                    self.draw(pnr)
+
+    @overload
+    def __getitem__(self, pnr: int) -> np.ndarray: ...
+
+    @overload
+    def __getitem__(self, pnr: slice) -> list[np.ndarray]: ...
+
+    def __getitem__(self, pnr):
+        if isinstance(pnr, slice):
+            return [self[i] for i in range(len(self))[pnr]]
+        return self._cells[pnr, : self._sizes[pnr]]
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def __iter__(self):
+        for pnr in range(len(self)):
+            yield self[pnr]
+
+    def __deepcopy__(self, memo) -> "KnowledgeTensor":
+        result = KnowledgeTensor.__new__(KnowledgeTensor)
+        result._cells = self._cells.copy()
+        result._sizes = self._sizes[:]
+        return result
+
+    def share(self) -> "KnowledgeTensor":
+        """
+        A copy of the tensor that shares its array with this one. Whichever of the two
+        is changed first copies the array then (copy-on-write), so a copy that is
+        never changed costs nothing.
+        """
+        self._cells.flags.writeable = False
+        result = KnowledgeTensor.__new__(KnowledgeTensor)
+        result._cells = self._cells
+        result._sizes = self._sizes[:]
+        return result
+
+    def _writable(self) -> np.ndarray:
+        # the array, copied first if it is shared with another tensor, see share
+        if not self._cells.flags.writeable:
+            self._cells = self._cells.copy()
+        return self._cells
+
+    def draw(self, pnr: int) -> None:
+        """
+        Add a card nobody has any information about to the end of a player's hand.
+        """
+        size = self._sizes[pnr]
+        self._writable()[pnr, size] = INITIAL_CARD_KNOWLEDGE
+        self._sizes[pnr] = size + 1
+
+    def remove(self, pnr: int, cnr: int) -> None:
+        """
+        Remove the knowledge about a card that was played or discarded, shifting the
+        cards to its right one slot to the left.
+        """
+        size = self._sizes[pnr]
+        cells = self._writable()
+        cells[pnr, cnr : size - 1] = cells[pnr, cnr + 1 : size]
+        self._sizes[pnr] = size - 1
+
+    def insert(self, pnr: int, cnr: int, card_knowledge) -> None:
+        """
+        Put the knowledge about a card back into a player's hand at index `cnr`,
+        shifting the cards from that index on one slot to the right.
+        """
+        size = self._sizes[pnr]
+        cells = self._writable()
+        cells[pnr, cnr + 1 : size + 1] = cells[pnr, cnr:size]
+        cells[pnr, cnr] = card_knowledge
+        self._sizes[pnr] = size + 1
+
+    def assign(self, pnr: int, hand_knowledge) -> None:
+        """
+        Replace the knowledge about all the cards in a player's hand, e.g. to take
+        back a hint.
+        """
+        self._writable()[pnr, : self._sizes[pnr]] = hand_knowledge
+
+    def hint_color(self, pnr: int, color: Color, positive) -> None:
+        """
+        Apply a color hint to a player's hand. `positive` holds one boolean per card,
+        True iff that card has the hinted color.
+        """
+        keep = np.asarray(positive, dtype=bool)
+        cells = COLOR_CELLS[color]
+        self._writable()[pnr, : len(keep)] *= np.where(
+            keep[:, None, None], cells, ~cells
+        )
+
+    def hint_rank(self, pnr: int, rank: int, positive) -> None:
+        """
+        Apply a rank hint to a player's hand. `positive` holds one boolean per card,
+        True iff that card has the hinted (1-based) rank.
+        """
+        keep = np.asarray(positive, dtype=bool)
+        cells = RANK_CELLS[rank - 1]
+        self._writable()[pnr, : len(keep)] *= np.where(
+            keep[:, None, None], cells, ~cells
+        )
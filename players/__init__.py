@@ -1,19 +1,53 @@
-from .base import Player
-from .fully_intentional import FullyIntentionalPlayer
-from .hanasim import HanaSimPlayer
-from .self_intentional_with_memory import SelfIntentionalPlayerWithMemory
-from .inner_state import InnerStatePlayer
-from .outer_state import OuterStatePlayer
-from .self_recognition import SelfRecognitionPlayer
-from .intentional import IntentionalPlayer
-from .self_intentional import SelfIntentionalPlayer
-from .self_intentional_detect_dead_colors import SelfIntentionalPlayerDetectDeadColors
-from .sampling_recognition import SamplingRecognitionPlayer
-from .llm_agent import LLMAgentPlayer
-from .timed import TimedPlayer
+import importlib
+from typing import TYPE_CHECKING
+
+from .base import Player, ViewPlayer
+
+# the other players are imported on first use, so that importing one player does not
+# import them all (and the LLM agent's dependencies with them)
+_MODULES = {
+    "FullyIntentionalPlayer": ".fully_intentional",
+    "SelfIntentionalPlayerWithMemory": ".self_intentional_with_memory",
+    "InnerStatePlayer": ".inner_state",
+    "OuterStatePlayer": ".outer_state",
+    "SelfRecognitionPlayer": ".self_recognition",
+    "IntentionalPlayer": ".intentional",
+    "SelfIntentionalPlayer": ".self_intentional",
+    "SelfIntentionalPlayerDetectDeadColors": ".self_intentional_detect_dead_colors",
+    "SamplingRecognitionPlayer": ".sampling_recognition",
+    "TimedPlayer": ".timed",
+    "HanaSimPlayer": ".hanasim",
+    "LLMAgentPlayer": ".llm_agent",
+}
+
+if TYPE_CHECKING:
+    from .fully_intentional import FullyIntentionalPlayer
+    from .hanasim import HanaSimPlayer
+    from .self_intentional_with_memory import SelfIntentionalPlayerWithMemory
+    from .inner_state import InnerStatePlayer
+    from .outer_state import OuterStatePlayer
+    from .self_recognition import SelfRecognitionPlayer
+    from .intentional import IntentionalPlayer
+    from .self_intentional import SelfIntentionalPlayer
+    from .self_intentional_detect_dead_colors import (
+        SelfIntentionalPlayerDetectDeadColors,
+    )
+    from .sampling_recognition import SamplingRecognitionPlayer
+    from .llm_agent import LLMAgentPlayer
+    from .timed import TimedPlayer
+
+
+def __getattr__(name: str):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_MODULES[name], __name__), name)
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     "Player",
+    "ViewPlayer",
     "FullyIntentionalPlayer",
     "SelfIntentionalPlayerWithMemory",
     "InnerStatePlayer",
@@ -2,7 +2,8 @@ import random
 from typing import Final
 
 from typing import TYPE_CHECKING
-from utils import Action
+from turn import TurnView
+from utils import GLOBAL_RNG, Action
 
 # HACK: Player.inform is tightly coupled to AbstractGame
 #   to fix: extract an interface from AbstractGame to invert the two-way dependency
@@ -15,6 +16,9 @@ class Player:
         self.name: str = name
         self.pnr: int = pnr
         self._hand_size: Final[int] = hand_size
+        # the source of all of the player's randomness; the game sets it to its own
+        # generator, so that a game is reproducible from its seed alone
+        self.rng: random.Random = GLOBAL_RNG
 
         self.explanation: list = []
 
@@ -28,10 +32,34 @@ class Player:
     def get_action(
         self, nr, hands, knowledge, trash, played, board, valid_actions, hints
     ) -> Action:
-        return random.choice(valid_actions)
+        return self.rng.choice(valid_actions)
+
+    def act(self, view: TurnView) -> Action:
+        """
+        Choose an action given the `view` of the turn, which is how the games ask
+        for one. Players that use the facts the view derives override this and let
+        `get_action` wrap its arguments in a view; the others only implement
+        `get_action`, which this passes the view's arguments to.
+        """
+        return self.get_action(*view)
 
     def inform(self, action: Action, player: int, game: "AbstractGame"):
         pass
 
     def get_explanation(self):
         return self.explanation
+
+
+class ViewPlayer(Player):
+    """
+    A player that implements `act` rather than `get_action`, and whose
+    `get_action` wraps its arguments in a `TurnView` and passes it to `act`, so that
+    both can be called. Subclasses must override `act`.
+    """
+
+    def get_action(
+        self, nr, hands, knowledge, trash, played, board, valid_actions, hints
+    ) -> Action:
+        return self.act(
+            TurnView(nr, hands, knowledge, trash, played, board, valid_actions, hints)
+        )
@@ -1,8 +1,18 @@
-import random
 from typing import override
 
 from players import Player
-from utils import get_possible, playable, Action, discardable, Intent, Color, pretend
+from utils import (
+    card_counts,
+    card_id,
+    Action,
+    Intent,
+    Color,
+    pretend,
+    board_masks,
+    get_possible_mask,
+    playable_mask,
+    discardable_mask,
+)
 
 
 class FullyIntentionalPlayer(Player):
@@ -30,22 +40,23 @@ class FullyIntentionalPlayer(Player):
 
         self.gothint = None
         for k in knowledge[nr]:
-            possible.append(get_possible(k))
+            possible.append(get_possible_mask(k))
 
         # for the current player, get the cards that are certainly playable and certainly discardable
         discards = []  # index of certainly discardable cards in the hand
         plays = []  # index of certainly playable cards in the hand
+        masks = board_masks(board)
         for i, p in enumerate(possible):
-            if playable(p, board):
+            if playable_mask(p, masks):
                 plays.append(i)
-            if discardable(p, board):
+            if discardable_mask(p, masks):
                 discards.append(i)
 
         # for all other players, determine the ideal goal for each of their cards
         playables = []
         useless = []
         discardables = []
-        othercards = trash + board
+        othercards = card_counts(trash + board)
         intentions: list[Intent | None] = [None for _ in list(range(handsize))]
         for i, h in enumerate(hands):
             if i != nr:
@@ -57,7 +68,7 @@ class FullyIntentionalPlayer(Player):
                         useless.append((i, j))
                         if not intentions[j]:
                             intentions[j] = Intent.DISCARD
-                    if n < 5 and (col, n) not in othercards:
+                    if n < 5 and not othercards[card_id((col, n))]:
                         discardables.append((i, j))
                         if not intentions[j]:
                             intentions[j] = Intent.CAN_DISCARD
@@ -102,7 +113,7 @@ class FullyIntentionalPlayer(Player):
             if i == nr or True:
                 continue
             cards = list(range(len(k)))
-            random.shuffle(cards)
+            self.rng.shuffle(cards)
             c = cards[0]
             (col, num) = hands[i][c]
             hinttype = [Action.ActionType.HINT_COLOR, Action.ActionType.HINT_NUMBER]
@@ -111,14 +122,14 @@ class FullyIntentionalPlayer(Player):
             for h in self.hints[(c, i)]:
                 hinttype.remove(h)
             if hinttype and hints > 0:
-                if random.choice(hinttype) == Action.ActionType.HINT_COLOR:
+                if self.rng.choice(hinttype) == Action.ActionType.HINT_COLOR:
                     self.hints[(c, i)].append(Action.ActionType.HINT_COLOR)
                     return Action(Action.ActionType.HINT_COLOR, pnr=i, col=col)
                 else:
                     self.hints[(c, i)].append(Action.ActionType.HINT_NUMBER)
                     return Action(Action.ActionType.HINT_NUMBER, pnr=i, num=num)
 
-        return random.choice(
+        return self.rng.choice(
             [Action(Action.ActionType.DISCARD, cnr=i) for i in list(range(handsize))]
         )
 
@@ -1,40 +1,36 @@
-import random
+from typing import override
 
-from players import Player
-from utils import get_possible, playable, Action, discardable
+from players import ViewPlayer
+from turn import TurnView
+from utils import (
+    Action,
+    playable_mask,
+    discardable_mask,
+)
 
 
-class InnerStatePlayer(Player):
+class InnerStatePlayer(ViewPlayer):
     def __init__(self, name, pnr):
         super().__init__(name, pnr)
 
-    def get_action(
-        self, nr, hands, knowledge, trash, played, board, valid_actions, hints
-    ):
-        possible = []
-        for k in knowledge[nr]:
-            possible.append(get_possible(k))
-
+    @override
+    def act(self, view: TurnView) -> Action:
+        (nr, hands, knowledge, trash, played, board, valid_actions, hints) = view
         discards = []
-        for i, p in enumerate(possible):
-            if playable(p, board):
+        masks = view.masks
+        for i, p in enumerate(view.possible_masks):
+            if playable_mask(p, masks):
                 return Action(Action.ActionType.PLAY, cnr=i)
-            if discardable(p, board):
+            if discardable_mask(p, masks):
                 discards.append(i)
 
         if discards:
-            return Action(Action.ActionType.DISCARD, cnr=random.choice(discards))
-
-        playables = []
-        for i, h in enumerate(hands):
-            if i != nr:
-                for j, (col, n) in enumerate(h):
-                    if board[col][1] + 1 == n:
-                        playables.append((i, j))
+            return Action(Action.ActionType.DISCARD, cnr=self.rng.choice(discards))
 
+        playables = view.playables
         if playables and hints > 0:
             i, j = playables[0]
-            if random.random() < 0.5:
+            if self.rng.random() < 0.5:
                 return Action(Action.ActionType.HINT_COLOR, pnr=i, col=hands[i][j][0])
             return Action(Action.ActionType.HINT_NUMBER, pnr=i, num=hands[i][j][1])
 
@@ -42,12 +38,12 @@ class InnerStatePlayer(Player):
             if i == nr:
                 continue
             cards = list(range(len(k)))
-            random.shuffle(cards)
+            self.rng.shuffle(cards)
             c = cards[0]
             (col, num) = hands[i][c]
             hinttype = [Action.ActionType.HINT_COLOR, Action.ActionType.HINT_NUMBER]
             if hinttype and hints > 0:
-                if random.choice(hinttype) == Action.ActionType.HINT_COLOR:
+                if self.rng.choice(hinttype) == Action.ActionType.HINT_COLOR:
                     return Action(Action.ActionType.HINT_COLOR, pnr=i, col=col)
                 else:
                     return Action(Action.ActionType.HINT_NUMBER, pnr=i, num=num)
@@ -61,8 +57,8 @@ class InnerStatePlayer(Player):
                 prefer.append(v)
         prefer = []
         if prefer and hints > 0:
-            return random.choice(prefer)
-        return random.choice(
+            return self.rng.choice(prefer)
+        return self.rng.choice(
             [Action(Action.ActionType.DISCARD, cnr=i) for i in range(len(knowledge[0]))]
         )
 
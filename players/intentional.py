@@ -1,23 +1,24 @@
-import random
 from typing import override
 
-from players import Player
+from players import ViewPlayer
+from turn import TurnView
 from utils import (
-    get_possible,
-    playable,
+    card_id,
     Action,
-    discardable,
     Intent,
     Color,
-    pretend,
+    pretend_all,
+    format_hint,
     f,
     format_intention,
     format_knowledge,
-    pretend_discard,
+    pretend_discards,
+    playable_mask,
+    discardable_mask,
 )
 
 
-class IntentionalPlayer(Player):
+class IntentionalPlayer(ViewPlayer):
     def __init__(self, name, pnr):
         super().__init__(name, pnr)
         self.hints = {}
@@ -28,37 +29,34 @@ class IntentionalPlayer(Player):
         self.hints = {}
         self.got_hint = None
 
-    def get_action(
-        self, nr, hands, knowledge, trash, played, board, valid_actions, hints
-    ):
+    @override
+    def act(self, view: TurnView) -> Action:
+        (nr, hands, knowledge, trash, played, board, valid_actions, hints) = view
         handsize = len(knowledge[0])
-        possible = []
         result = None  # the action the player will choose
         self.explanation = []
         self.explanation.append(["Your Hand:"] + list(map(f, hands[1 - nr])))
 
-        # Get all possible identities for each card
         self.got_hint = None
-        for k in knowledge[nr]:
-            possible.append(get_possible(k))
 
-        # Identify discards and playable cards
+        # Identify discards and playable cards from the possible identities of each
         discards = []
-        for i, p in enumerate(possible):
-            if playable(p, board):
+        masks = view.masks
+        for i, p in enumerate(view.possible_masks):
+            if playable_mask(p, masks):
                 result = Action(Action.ActionType.PLAY, cnr=i)
-            if discardable(p, board):
+            if discardable_mask(p, masks):
                 discards.append(i)
 
         # If no play is possible, discard
         if discards and hints < 8 and not result:
-            result = Action(Action.ActionType.DISCARD, cnr=random.choice(discards))
+            result = Action(Action.ActionType.DISCARD, cnr=self.rng.choice(discards))
 
         # Track the goal for the other player's hand
         playables = []
         useless = []
         discardables = []
-        othercards = trash + board
+        othercards = view.trash_and_board_counts
         intentions: list[Intent | None] = [None for _ in range(handsize)]
         for i, h in enumerate(hands):
             if i != nr:
@@ -71,7 +69,7 @@ class IntentionalPlayer(Player):
                         useless.append((i, j))
                         if not intentions[j]:
                             intentions[j] = Intent.DISCARD
-                    if n < 5 and (col, n) not in othercards:
+                    if n < 5 and not othercards[card_id((col, n))]:
                         discardables.append((i, j))
                         if not intentions[j]:
                             intentions[j] = Intent.CAN_DISCARD
@@ -82,37 +80,16 @@ class IntentionalPlayer(Player):
 
         # Choose a hint if possible
         if hints > 0:
-            action: tuple[Action.ActionType, Color | int]
             valid: list[tuple[tuple[Action.ActionType, Color | int], int]] = []
-            for c in Color:
-                action = (Action.ActionType.HINT_COLOR, c)
-                # print("HINT", COLORNAMES[c],)
-                (isvalid, score, expl) = pretend(
-                    action, knowledge[1 - nr], intentions, hands[1 - nr], board, trash
-                )
-                self.explanation.append(
-                    ["Prediction for: Hint Color " + c.display_name]
-                    + list(map(format_intention, expl))
-                )
-                # print(isvalid, score)
-                if isvalid:
-                    valid.append((action, score))
-
-            for r in range(5):
-                r += 1
-                action = (Action.ActionType.HINT_NUMBER, r)
-                # print("HINT", r,)
-
-                (isvalid, score, expl) = pretend(
-                    action, knowledge[1 - nr], intentions, hands[1 - nr], board, trash
-                )
+            for prediction in pretend_all(
+                hands, knowledge, intentions, board, trash, [1 - nr]
+            ):
                 self.explanation.append(
-                    ["Prediction for: Hint Rank " + str(r)]
-                    + list(map(format_intention, expl))
+                    ["Prediction for: " + format_hint(prediction.hint)]
+                    + list(map(format_intention, prediction.predictions))
                 )
-                # print(isvalid, score)
-                if isvalid:
-                    valid.append((action, score))
+                if prediction.valid:
+                    valid.append((prediction.hint, prediction.score))
 
             if valid and not result:
                 valid.sort(key=lambda x: -x[1])
@@ -128,12 +105,8 @@ class IntentionalPlayer(Player):
         self.explanation.append(
             ["My Knowledge"] + list(map(format_knowledge, knowledge[nr]))
         )
-        possible = [
-            Action(Action.ActionType.DISCARD, cnr=i) for i in list(range(handsize))
-        ]
-
-        scores = list(
-            map(lambda p: pretend_discard(p, knowledge[nr], board, trash), possible)
+        scores = pretend_discards(
+            knowledge[nr][:handsize], board, trash, unseen=view.unseen
         )
 
         def format_term(x):
@@ -1,4 +1,3 @@
-import numpy as np
 import re
 import os
 from openai import OpenAI
@@ -434,7 +433,7 @@ class LLMAgentPlayer(Player):
             idx = [t.lower() for t in self.transformed].index(selected_move)
             return self.transformed[idx]
         else:
-            return np.random.choice(self.transformed)
+            return self.rng.choice(self.transformed)
 
     @override
     def get_action(
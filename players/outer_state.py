@@ -1,11 +1,15 @@
-import random
 from typing import override
 
-from players import Player
-from utils import get_possible, playable, Action, discardable
+from players import ViewPlayer
+from turn import TurnView
+from utils import (
+    Action,
+    playable_mask,
+    discardable_mask,
+)
 
 
-class OuterStatePlayer(Player):
+class OuterStatePlayer(ViewPlayer):
     def __init__(self, name, pnr):
         super().__init__(name, pnr)
         self.hints = {}
@@ -14,31 +18,22 @@ class OuterStatePlayer(Player):
     def reset(self) -> None:
         self.hints = {}
 
-    def get_action(
-        self, nr, hands, knowledge, trash, played, board, valid_actions, hints
-    ):
+    @override
+    def act(self, view: TurnView) -> Action:
+        (nr, hands, knowledge, trash, played, board, valid_actions, hints) = view
         handsize = len(knowledge[0])
-        possible = []
-        for k in knowledge[nr]:
-            possible.append(get_possible(k))
-
         discards = []
-        for i, p in enumerate(possible):
-            if playable(p, board):
+        masks = view.masks
+        for i, p in enumerate(view.possible_masks):
+            if playable_mask(p, masks):
                 return Action(Action.ActionType.PLAY, cnr=i)
-            if discardable(p, board):
+            if discardable_mask(p, masks):
                 discards.append(i)
 
         if discards:
-            return Action(Action.ActionType.DISCARD, cnr=random.choice(discards))
+            return Action(Action.ActionType.DISCARD, cnr=self.rng.choice(discards))
 
-        playables = []
-        for i, h in enumerate(hands):
-            if i != nr:
-                for j, (col, n) in enumerate(h):
-                    if board[col][1] + 1 == n:
-                        playables.append((i, j))
-        playables.sort(key=lambda x: -hands[x[0]][x[1]][1])
+        playables = sorted(view.playables, key=lambda x: -hands[x[0]][x[1]][1])
         while playables and hints > 0:
             i, j = playables[0]
 
@@ -51,7 +46,7 @@ class OuterStatePlayer(Player):
 
             t = None
             if hinttype:
-                t = random.choice(hinttype)
+                t = self.rng.choice(hinttype)
 
             if t == Action.ActionType.HINT_NUMBER:
                 self.hints[(j, i)].append(Action.ActionType.HINT_NUMBER)
@@ -66,7 +61,7 @@ class OuterStatePlayer(Player):
             if i == nr:
                 continue
             cards = list(range(len(k)))
-            random.shuffle(cards)
+            self.rng.shuffle(cards)
             c = cards[0]
             (col, num) = hands[i][c]
             hinttype = [Action.ActionType.HINT_COLOR, Action.ActionType.HINT_NUMBER]
@@ -75,14 +70,14 @@ class OuterStatePlayer(Player):
             for h in self.hints[(c, i)]:
                 hinttype.remove(h)
             if hinttype and hints > 0:
-                if random.choice(hinttype) == Action.ActionType.HINT_COLOR:
+                if self.rng.choice(hinttype) == Action.ActionType.HINT_COLOR:
                     self.hints[(c, i)].append(Action.ActionType.HINT_COLOR)
                     return Action(Action.ActionType.HINT_COLOR, pnr=i, col=col)
                 else:
                     self.hints[(c, i)].append(Action.ActionType.HINT_NUMBER)
                     return Action(Action.ActionType.HINT_NUMBER, pnr=i, num=num)
 
-        return random.choice(
+        return self.rng.choice(
             [Action(Action.ActionType.DISCARD, cnr=i) for i in list(range(handsize))]
         )
 
@@ -0,0 +1,73 @@
+"""
+The AIs that can be chosen by name, e.g. on the command line of hanabi.py or in the
+web UI.
+
+The registry maps each name to the module and class of its player and only imports
+the module the first time the name is looked up, so that a run between two outer
+state players does not import the LLM agent and its dependencies.
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Iterator, Mapping
+
+if TYPE_CHECKING:
+    from players import Player
+
+
+class PlayerRegistry(Mapping[str, type["Player"]]):
+    """
+    A read-only mapping from AI names to player classes, which are imported on
+    first use from their "module:Class" paths.
+    """
+
+    def __init__(self, paths: Mapping[str, str]) -> None:
+        self._paths = dict(paths)
+        self._classes: dict[str, type[Player]] = {}
+
+    def __getitem__(self, name: str) -> type["Player"]:
+        cls = self._classes.get(name)
+        if cls is None:
+            module, _, attr = self._paths[name].partition(":")
+            cls = getattr(importlib.import_module(module), attr)
+            self._classes[name] = cls
+        return cls
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+
+PLAYER_TYPES = PlayerRegistry(
+    {
+        "random": "players.base:Player",
+        "inner": "players.inner_state:InnerStatePlayer",
+        "outer": "players.outer_state:OuterStatePlayer",
+        "self": "players.self_recognition:SelfRecognitionPlayer",
+        "intentional": "players.intentional:IntentionalPlayer",
+        "sample": "players.sampling_recognition:SamplingRecognitionPlayer",
+        "full": "players.self_intentional:SelfIntentionalPlayer",
+        "timed": "players.timed:TimedPlayer",
+        "full-with-mem": (
+            "players.self_intentional_with_memory:SelfIntentionalPlayerWithMemory"
+        ),
+        "full-detect-dead": (
+            "players.self_intentional_detect_dead_colors"
+            ":SelfIntentionalPlayerDetectDeadColors"
+        ),
+        "llm": "players.llm_agent:LLMAgentPlayer",
+    }
+)
+
+# the AIs a human can play with in the web UI
+WEB_PLAYERS = (
+    "random",
+    "inner",
+    "outer",
+    "self",
+    "intentional",
+    "full",
+    "full-with-mem",
+    "full-detect-dead",
+)
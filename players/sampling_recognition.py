@@ -1,56 +1,100 @@
-import random
 import copy
 from typing import override, Final
 
-from players import Player, IntentionalPlayer
-from utils import get_possible, playable, Action, discardable, Color, COUNTS, iscard
-
+import numpy as np
+
+from players import Player, IntentionalPlayer, ViewPlayer
+from players.self_recognition import HandMarginals, hint_symmetry
+from turn import TurnView
+from utils import (
+    Action,
+    NUM_CARD_IDS,
+    card_from_id,
+    card_id,
+    get_possible_ids,
+    iscard,
+    playable_mask,
+    discardable_mask,
+)
 
 a = 1
 
 
-def do_sample(knowledge):
-    if not knowledge:
-        return []
-
-    possible = []
-
-    for col in Color:
-        for i, c in enumerate(knowledge[0][col]):
-            for j in list(range(c)):
-                possible.append((col, i + 1))
-    if not possible:
-        return None
-
-    other = do_sample(knowledge[1:])
-    if other is None:
-        return None
-    sample = random.choice(possible)
-    return [sample] + other
-
-
-def sample_hand(knowledge):
-    result = None
-    while result is None:
-        result = do_sample(knowledge)
-    return result
-
-
-used = {}
-for c in Color:
-    for i, cnt in enumerate(COUNTS):
-        used[(c, i + 1)] = 0
-
-
-def update_knowledge(knowledge, used):
-    result = copy.deepcopy(knowledge)
-    for r in result:
-        for c, nr in used:
-            r[c][nr - 1] = max(r[c][nr - 1] - used[c, nr], 0)
-    return result
-
-
-class SamplingRecognitionPlayer(Player):
+def sample_hands(knowledge, remaining, count, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw `count` hands that are consistent with `knowledge`, a card knowledge
+    structure per card, from `remaining`, the number of copies of each card id that
+    are not known to be elsewhere. Each hand is drawn with probability proportional
+    to the number of ways to deal it from the remaining copies, as weighed by
+    `generate_hands_counted`.
+
+    Returns a (count, len(knowledge)) array of card ids, which has no rows if no hand
+    is consistent with `knowledge` and `remaining`.
+
+    The cards are dealt one card id at a time, by choosing the set of positions that
+    get it among those still empty, given the number of ways to fill the others with
+    the later card ids. Those numbers are counted once, backwards from the last card
+    id, so that no hand has to be rejected.
+    """
+    size = len(knowledge)
+    full = (1 << size) - 1
+    # the positions that may hold each card id, as bitmasks
+    allowed = [0] * NUM_CARD_IDS
+    for pos, k in enumerate(knowledge):
+        for cid in get_possible_ids(k):
+            allowed[cid] |= 1 << pos
+    popcount = [bin(positions).count("1") for positions in range(full + 1)]
+
+    # completions[cid, filled] is the number of ways to fill the positions not in
+    # `filled` with card ids from cid on; options[cid][filled, i] are the sets of
+    # positions that can get cid next, and cumulative[cid][filled, i] the number of
+    # ways to complete the hand with one of the first i + 1 of them
+    completions = np.zeros((NUM_CARD_IDS + 1, full + 1))
+    completions[NUM_CARD_IDS, full] = 1
+    options = {}
+    cumulative = {}
+    for cid in reversed(range(NUM_CARD_IDS)):
+        copies = int(remaining[cid])
+        if not copies or not allowed[cid]:
+            completions[cid] = completions[cid + 1]
+            continue
+        # the number of ways to deal each number of copies of cid
+        ways = [1]
+        for n in range(size):
+            ways.append(ways[-1] * max(copies - n, 0))
+        options[cid] = np.zeros((full + 1, full + 1), dtype=np.int64)
+        cumulative[cid] = np.full((full + 1, full + 1), np.inf)
+        for filled in range(full + 1):
+            free = allowed[cid] & ~filled
+            subset = free
+            total = 0.0
+            i = 0
+            while True:
+                total += ways[popcount[subset]] * completions[cid + 1, filled | subset]
+                options[cid][filled, i] = subset
+                cumulative[cid][filled, i] = total
+                i += 1
+                if not subset:
+                    break
+                subset = (subset - 1) & free
+            completions[cid, filled] = total
+
+    hands = np.zeros((count if completions[0, 0] else 0, size), dtype=np.int64)
+    # the positions of each hand that have been dealt a card so far
+    dealt = np.zeros(len(hands), dtype=np.int64)
+    for cid in sorted(options):
+        # the first set of positions whose cumulative count exceeds a uniform draw
+        # of the hands' completions
+        drawn = rng.random(len(hands)) * completions[cid, dealt]
+        choice = (cumulative[cid][dealt] <= drawn[:, None]).sum(axis=1)
+        subsets = options[cid][dealt, choice]
+        for pos in range(size):
+            hands[(subsets >> pos) & 1 == 1, pos] = cid
+        dealt |= subsets
+    return hands
+
+
+class SamplingRecognitionPlayer(ViewPlayer):
     other: Final[type[Player]]
     maxtime: Final[int]
 
@@ -72,58 +116,54 @@ class SamplingRecognitionPlayer(Player):
         self.last_played = []
         self.last_board = []
 
-    def get_action(
-        self, nr, hands, knowledge, trash, played, board, valid_actions, hints
-    ):
+    @override
+    def act(self, view: TurnView) -> Action:
+        (nr, hands, knowledge, trash, played, board, valid_actions, hints) = view
         handsize = len(knowledge[0])
-        possible = []
 
         if self.gothint:
-            possiblehands = []
+            marginals = HandMarginals(len(knowledge[nr]))
             wrong = 0
-            used = {}
-
-            for c in trash + played:
-                if c not in used:
-                    used[c] = 0
-                used[c] += 1
-
-            i = 0
-            while i < self.maxtime:
-                i += 1
-                h = sample_hand(update_knowledge(knowledge[nr], used))
-                newhands = hands[:]
-                newhands[nr] = h
-                other = self.other("Pinocchio", self.gothint[1])
-                act = other.get_action(
-                    self.gothint[1],
-                    newhands,
-                    self.last_knowledge,
-                    self.last_trash,
-                    self.last_played,
-                    self.last_board,
-                    valid_actions,
-                    hints + 1,
-                )
-                lastact = self.gothint[0]
-                if act == lastact:
-                    possiblehands.append(h)
+            remaining = view.unseen.copy()
+            for i, h in enumerate(hands):
+                if i != nr:
+                    for card in h:
+                        remaining[card_id(card)] -= 1
+
+            # the turn of the partner who gave the hint, as they saw it; only the
+            # guess of this player's hand changes from one sample to the next
+            partner = TurnView(
+                self.gothint[1],
+                hands,
+                self.last_knowledge,
+                self.last_trash,
+                self.last_played,
+                self.last_board,
+                valid_actions,
+                hints + 1,
+            )
+            # the partner is only simulated for one hand of each class of hands that
+            # are the same up to swapping interchangeable colors, and only once
+            symmetry = hint_symmetry(partner, nr, self.gothint[0])
+            explains: dict[tuple, bool] = {}
+            rng = np.random.default_rng(self.rng.getrandbits(64))
+            for row in sample_hands(knowledge[nr], remaining, self.maxtime, rng):
+                h = tuple(card_from_id(cid) for cid in row.tolist())
+                canonical = symmetry.canonical(h)
+                if canonical not in explains:
+                    newhands = hands[:]
+                    newhands[nr] = canonical
+                    other = self.other("Pinocchio", self.gothint[1])
+                    other.rng = self.rng
+                    act = other.act(partner.replace(hands=newhands))
+                    explains[canonical] = act == self.gothint[0]
+                if explains[canonical]:
+                    marginals.add(h)
                 else:
                     wrong += 1
-            # print("sampled", i)
-            # print(len(possiblehands), "would have led to", self.gothint[0], "and not:", wrong)
-            # print(f(possiblehands))
-            if possiblehands:
-                mostlikely = [(0, 0) for i in range(len(possiblehands[0]))]
-                for i in range(len(possiblehands[0])):
-                    counts = {}
-                    for h in possiblehands:
-                        if h[i] not in counts:
-                            counts[h[i]] = 0
-                        counts[h[i]] += 1
-                    for c in counts:
-                        if counts[c] > mostlikely[i][1]:
-                            mostlikely[i] = (c, counts[c])
+            # print(marginals.hands, "would have led to", self.gothint[0], "and not:", wrong)
+            if marginals.hands:
+                mostlikely = marginals.most_likely()
                 # print("most likely:", mostlikely)
                 m = max(mostlikely, key=lambda x: x[1])
                 second = mostlikely[:]
@@ -133,28 +173,21 @@ class SamplingRecognitionPlayer(Player):
                     # print(">>>>>>> deduced!", f(m[0]), m[1],"vs", f(m2[0]), m2[1])
                     knowledge = copy.deepcopy(knowledge)
                     knowledge[nr][mostlikely.index(m)] = iscard(m[0])
+                    view = view.replace(knowledge=knowledge)
 
         self.gothint = None
-        for k in knowledge[nr]:
-            possible.append(get_possible(k))
-
         discards = []
-        for i, p in enumerate(possible):
-            if playable(p, board):
+        masks = view.masks
+        for i, p in enumerate(view.possible_masks):
+            if playable_mask(p, masks):
                 return Action(Action.ActionType.PLAY, cnr=i)
-            if discardable(p, board):
+            if discardable_mask(p, masks):
                 discards.append(i)
 
         if discards:
-            return Action(Action.ActionType.DISCARD, cnr=random.choice(discards))
-
-        playables = []
-        for i, h in enumerate(hands):
-            if i != nr:
-                for j, (col, n) in enumerate(h):
-                    if board[col][1] + 1 == n:
-                        playables.append((i, j))
-        playables.sort(key=lambda x: -hands[x[0]][x[1]][1])
+            return Action(Action.ActionType.DISCARD, cnr=self.rng.choice(discards))
+
+        playables = sorted(view.playables, key=lambda x: -hands[x[0]][x[1]][1])
         while playables and hints > 0:
             i, j = playables[0]
 
@@ -178,7 +211,7 @@ class SamplingRecognitionPlayer(Player):
             if i == nr:
                 continue
             cards = list(range(len(k)))
-            random.shuffle(cards)
+            self.rng.shuffle(cards)
             c = cards[0]
             (col, num) = hands[i][c]
             hinttype = [Action.ActionType.HINT_COLOR, Action.ActionType.HINT_NUMBER]
@@ -187,14 +220,14 @@ class SamplingRecognitionPlayer(Player):
             for h in self.hints[(c, i)]:
                 hinttype.remove(h)
             if hinttype and hints > 0:
-                if random.choice(hinttype) == Action.ActionType.HINT_COLOR:
+                if self.rng.choice(hinttype) == Action.ActionType.HINT_COLOR:
                     self.hints[(c, i)].append(Action.ActionType.HINT_COLOR)
                     return Action(Action.ActionType.HINT_COLOR, pnr=i, col=col)
                 else:
                     self.hints[(c, i)].append(Action.ActionType.HINT_NUMBER)
                     return Action(Action.ActionType.HINT_NUMBER, pnr=i, num=num)
 
-        return random.choice(
+        return self.rng.choice(
             [Action(Action.ActionType.DISCARD, cnr=i) for i in list(range(handsize))]
         )
 
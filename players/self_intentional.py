@@ -1,25 +1,26 @@
-import random
 from typing import override
 
-from players import Player
+from players import ViewPlayer
+from turn import TurnView
 from utils import (
-    get_possible,
-    playable,
+    card_id,
     Action,
-    discardable,
     Intent,
     Color,
-    pretend,
+    pretend_all,
+    format_hint,
     f,
     format_intention,
     format_knowledge,
-    pretend_discard,
+    pretend_discards,
     whattodo,
     MAX_HINT_TOKENS,
+    playable_mask,
+    discardable_mask,
 )
 
 
-class SelfIntentionalPlayer(Player):
+class SelfIntentionalPlayer(ViewPlayer):
     def __init__(self, name, pnr):
         super().__init__(name, pnr)
         self.got_hint = None
@@ -28,11 +29,10 @@ class SelfIntentionalPlayer(Player):
     def reset(self) -> None:
         self.got_hint = None
 
-    def get_action(
-        self, nr, hands, knowledge, trash, played, board, valid_actions, hints
-    ):
+    @override
+    def act(self, view: TurnView) -> Action:
+        (nr, hands, knowledge, trash, played, board, valid_actions, hints) = view
         handsize = len(knowledge[0])
-        possible = []
         result = None
         self.explanation = []
         self.explanation.append(["Your Hand:"] + list(map(f, hands[1 - nr])))
@@ -66,25 +66,23 @@ class SelfIntentionalPlayer(Player):
                     result = Action(Action.ActionType.DISCARD, cnr=i)
 
         self.got_hint = None
-        for k in knowledge[nr]:
-            possible.append(get_possible(k))
-
         discardable_idx = []
-        for i, p in enumerate(possible):
-            if playable(p, board) and not result:
+        masks = view.masks
+        for i, p in enumerate(view.possible_masks):
+            if playable_mask(p, masks) and not result:
                 result = Action(Action.ActionType.PLAY, cnr=i)
-            if discardable(p, board):
+            if discardable_mask(p, masks):
                 discardable_idx.append(i)
 
         if discardable_idx and hints < MAX_HINT_TOKENS and not result:
             result = Action(
-                Action.ActionType.DISCARD, cnr=random.choice(discardable_idx)
+                Action.ActionType.DISCARD, cnr=self.rng.choice(discardable_idx)
             )
 
         playables = []
         useless = []
         discardables = []
-        othercards = trash + board
+        othercards = view.trash_and_board_counts
         intentions: list[Intent | None] = [None for _ in list(range(handsize))]
         for i, h in enumerate(hands):
             if i != nr:
@@ -96,7 +94,7 @@ class SelfIntentionalPlayer(Player):
                         useless.append((i, j))
                         if not intentions[j]:
                             intentions[j] = Intent.DISCARD
-                    if n < 5 and (col, n) not in othercards:
+                    if n < 5 and not othercards[card_id((col, n))]:
                         discardables.append((i, j))
                         if not intentions[j]:
                             intentions[j] = Intent.CAN_DISCARD
@@ -106,54 +104,23 @@ class SelfIntentionalPlayer(Player):
         )
 
         if hints > 0:
-            hint_action: tuple[Action.ActionType, Color | int]
             valid: list[tuple[tuple[Action.ActionType, Color | int], int, int]] = []
             redundant_hints: list[
                 tuple[tuple[Action.ActionType, Color | int], int]
             ] = []
 
-            for hintee_id in range(len(knowledge)):
-                if hintee_id == nr:
-                    continue
-
-                for c in Color:
-                    hint_action = (Action.ActionType.HINT_COLOR, c)
-                    (isvalid, score, expl) = pretend(
-                        hint_action,
-                        knowledge[hintee_id],
-                        intentions,
-                        hands[hintee_id],
-                        board,
-                        trash,
-                    )
-                    self.explanation.append(
-                        ["Prediction for: Hint Color " + c.display_name]
-                        + list(map(format_intention, expl))
-                    )
-                    if isvalid:
-                        valid.append((hint_action, score, hintee_id))
-                    if expl == ["No new information"]:
-                        redundant_hints.append((hint_action, hintee_id))
-
-                for r in range(5):
-                    r += 1
-                    hint_action = (Action.ActionType.HINT_NUMBER, r)
-                    (isvalid, score, expl) = pretend(
-                        hint_action,
-                        knowledge[hintee_id],
-                        intentions,
-                        hands[hintee_id],
-                        board,
-                        trash,
-                    )
-                    self.explanation.append(
-                        ["Prediction for: Hint Rank " + str(r)]
-                        + list(map(format_intention, expl))
-                    )
-                    if isvalid:
-                        valid.append((hint_action, score, hintee_id))
-                    if expl == ["No new information"]:
-                        redundant_hints.append((hint_action, hintee_id))
+            hintees = [i for i in range(len(knowledge)) if i != nr]
+            for prediction in pretend_all(
+                hands, knowledge, intentions, board, trash, hintees
+            ):
+                self.explanation.append(
+                    ["Prediction for: " + format_hint(prediction.hint)]
+                    + list(map(format_intention, prediction.predictions))
+                )
+                if prediction.valid:
+                    valid.append((prediction.hint, prediction.score, prediction.hintee))
+                if prediction.predictions == ["No new information"]:
+                    redundant_hints.append((prediction.hint, prediction.hintee))
 
             if valid and not result:
                 # sort descending by hint score
@@ -178,7 +145,7 @@ class SelfIntentionalPlayer(Player):
 
             # first, try to give a redundant hint
             if redundant_hints:
-                selected_action, hintee_id = random.choice(redundant_hints)
+                selected_action, hintee_id = self.rng.choice(redundant_hints)
                 if selected_action[0] is Action.ActionType.HINT_COLOR:
                     result = Action(
                         Action.ActionType.HINT_COLOR,
@@ -194,7 +161,7 @@ class SelfIntentionalPlayer(Player):
 
             else:
                 # if there are no redundant hints to give, give a random hint
-                result = random.choice(
+                result = self.rng.choice(
                     [
                         action
                         for action in valid_actions
@@ -206,12 +173,8 @@ class SelfIntentionalPlayer(Player):
         self.explanation.append(
             ["My Knowledge"] + list(map(format_knowledge, knowledge[nr]))
         )
-        possible = [
-            Action(Action.ActionType.DISCARD, cnr=i) for i in list(range(handsize))
-        ]
-
-        scores = list(
-            map(lambda p: pretend_discard(p, knowledge[nr], board, trash), possible)
+        scores = pretend_discards(
+            knowledge[nr][:handsize], board, trash, unseen=view.unseen
         )
 
         def format_term(x):
@@ -1,40 +1,52 @@
-import random
+from typing import override
 
-from players import Player
+from players import ViewPlayer
+from turn import TurnView
 from utils import (
-    get_possible,
-    playable,
+    CardTracker,
+    card_id,
     Action,
-    discardable,
     Intent,
     Color,
-    pretend,
+    pretend_all,
+    format_hint,
     f,
     format_intention,
     format_knowledge,
-    pretend_discard,
-    highest_playable_cards,
+    pretend_discards,
     whattodo,
+    playable_mask,
+    discardable_mask,
 )
 
 
-class SelfIntentionalPlayerDetectDeadColors(Player):
+class SelfIntentionalPlayerDetectDeadColors(ViewPlayer):
     def __init__(self, name, pnr):
         super().__init__(name, pnr)
         self.hints = {}
         self.pnr = pnr
         self.got_hint = None
+        # the game's card tracker, once the player has been informed by the game
+        self.cards: CardTracker | None = None
 
-    def get_action(
-        self, nr, hands, knowledge, trash, played, board, valid_actions, hints
-    ):
+    @override
+    def reset(self) -> None:
+        self.hints = {}
+        self.got_hint = None
+        self.cards = None
+
+    @override
+    def act(self, view: TurnView) -> Action:
+        (nr, hands, knowledge, trash, played, board, valid_actions, hints) = view
         handsize = len(knowledge[0])
-        possible = []
         result = None
         self.explanation = []
         self.explanation.append(["Your Hand:"] + list(map(f, hands[1 - nr])))
         action = []
-        dead_colors = highest_playable_cards(board, trash)
+        if self.cards is not None:
+            # the game's card tracker keeps the dead colors up to date
+            view.provide(dead_colors=self.cards.dead_colors)
+        dead_colors = view.dead_colors
 
         if self.got_hint:
             (act, plr) = self.got_hint
@@ -65,23 +77,21 @@ class SelfIntentionalPlayerDetectDeadColors(Player):
                     result = Action(Action.ActionType.DISCARD, cnr=i)
 
         self.got_hint = None
-        for k in knowledge[nr]:
-            possible.append(get_possible(k))
-
         discards = []
-        for i, p in enumerate(possible):
-            if playable(p, board, dead_colors) and not result:
+        masks = view.dead_masks
+        for i, p in enumerate(view.possible_masks):
+            if playable_mask(p, masks) and not result:
                 result = Action(Action.ActionType.PLAY, cnr=i)
-            if discardable(p, board, dead_colors):
+            if discardable_mask(p, masks):
                 discards.append(i)
 
         if discards and hints < 8 and not result:
-            result = Action(Action.ActionType.DISCARD, cnr=random.choice(discards))
+            result = Action(Action.ActionType.DISCARD, cnr=self.rng.choice(discards))
 
         playables = []
         useless = []
         discardables = []
-        othercards = trash + board
+        othercards = view.trash_and_board_counts
         intentions: list[Intent | None] = [None for _ in list(range(handsize))]
         for i, h in enumerate(hands):
             if i != nr:
@@ -93,7 +103,11 @@ class SelfIntentionalPlayerDetectDeadColors(Player):
                         useless.append((i, j))
                         if not intentions[j]:
                             intentions[j] = Intent.DISCARD
-                    if n < 5 and (col, n) not in othercards and n <= dead_colors[col]:
+                    if (
+                        n < 5
+                        and not othercards[card_id((col, n))]
+                        and n <= dead_colors[col]
+                    ):
                         discardables.append((i, j))
                         if not intentions[j]:
                             intentions[j] = Intent.CAN_DISCARD
@@ -103,45 +117,16 @@ class SelfIntentionalPlayerDetectDeadColors(Player):
         )
 
         if hints > 0:
-            hint_action: tuple[Action.ActionType, Color | int]
             valid: list[tuple[tuple[Action.ActionType, Color | int], int]] = []
-            for c in Color:
-                hint_action = (Action.ActionType.HINT_COLOR, c)
-                (isvalid, score, expl) = pretend(
-                    hint_action,
-                    knowledge[1 - nr],
-                    intentions,
-                    hands[1 - nr],
-                    board,
-                    trash,
-                    ignore_dead=True,
-                )
+            for prediction in pretend_all(
+                hands, knowledge, intentions, board, trash, [1 - nr], ignore_dead=True
+            ):
                 self.explanation.append(
-                    ["Prediction for: Hint Color " + c.display_name]
-                    + list(map(format_intention, expl))
+                    ["Prediction for: " + format_hint(prediction.hint)]
+                    + list(map(format_intention, prediction.predictions))
                 )
-                if isvalid:
-                    valid.append((hint_action, score))
-
-            for r in range(5):
-                r += 1
-                hint_action = (Action.ActionType.HINT_NUMBER, r)
-
-                (isvalid, score, expl) = pretend(
-                    hint_action,
-                    knowledge[1 - nr],
-                    intentions,
-                    hands[1 - nr],
-                    board,
-                    trash,
-                    ignore_dead=True,
-                )
-                self.explanation.append(
-                    ["Prediction for: Hint Rank " + str(r)]
-                    + list(map(format_intention, expl))
-                )
-                if isvalid:
-                    valid.append((hint_action, score))
+                if prediction.valid:
+                    valid.append((prediction.hint, prediction.score))
 
             if valid and not result:
                 valid.sort(key=lambda x: -x[1])
@@ -162,17 +147,8 @@ class SelfIntentionalPlayerDetectDeadColors(Player):
         self.explanation.append(
             ["My Knowledge"] + list(map(format_knowledge, knowledge[nr]))
         )
-        possible = [
-            Action(Action.ActionType.DISCARD, cnr=i) for i in list(range(handsize))
-        ]
-
-        scores = list(
-            map(
-                lambda p: pretend_discard(
-                    p, knowledge[nr], board, trash, ignore_dead=True
-                ),
-                possible,
-            )
+        scores = pretend_discards(
+            knowledge[nr][:handsize], board, trash, ignore_dead=True, unseen=view.unseen
         )
 
         def format_term(x):
@@ -199,6 +175,7 @@ class SelfIntentionalPlayerDetectDeadColors(Player):
         return scores[0][0]
 
     def inform(self, action: Action, player: int, game):
+        self.cards = game.cards
         if action.action_type in [Action.ActionType.PLAY, Action.ActionType.DISCARD]:
             assert action.cnr is not None
             if (action.cnr, player) in self.hints:
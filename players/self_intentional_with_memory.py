@@ -1,24 +1,24 @@
-import random
 from typing import Sequence, override, TYPE_CHECKING
 
-from players import Player
+from players import ViewPlayer
+from turn import TurnView
 
 if TYPE_CHECKING:
     # see players.base for an explanation of this hack
     from game import AbstractGame
 from utils import (
-    get_possible,
-    playable,
     Action,
-    discardable,
     Intent,
     Color,
-    pretend,
+    pretend_all,
+    format_hint,
     f,
     format_intention,
     format_knowledge,
-    pretend_discard,
+    pretend_discards,
     whattodo,
+    playable_mask,
+    discardable_mask,
 )
 
 
@@ -26,7 +26,7 @@ def _intent_unchanged(old: Intent | None, new: Intent | None) -> bool:
     return old == new or (old == Intent.PLAY and new is None)
 
 
-class SelfIntentionalPlayerWithMemory(Player):
+class SelfIntentionalPlayerWithMemory(ViewPlayer):
     pnr: int
     got_hint: tuple[Action, int] | None
     _intents_conveyed: list[Intent | None]
@@ -41,10 +41,9 @@ class SelfIntentionalPlayerWithMemory(Player):
         self.got_hint = None
         self._intents_conveyed = [None for _ in range(self._hand_size)]
 
-    def get_action(
-        self, pnr: int, hands, knowledge, trash, played, board, valid_actions, hints
-    ) -> Action:
-        possible = []
+    @override
+    def act(self, view: TurnView) -> Action:
+        (pnr, hands, knowledge, trash, played, board, valid_actions, hints) = view
         result = None
         self.explanation = []
         self.explanation.append(["Your Hand:"] + list(map(f, hands[1 - pnr])))
@@ -80,18 +79,16 @@ class SelfIntentionalPlayerWithMemory(Player):
                     result = Action(Action.ActionType.DISCARD, cnr=i)
 
         self.got_hint = None
-        for k in knowledge[pnr]:
-            possible.append(get_possible(k))
-
         discards = []
-        for i, p in enumerate(possible):
-            if playable(p, board) and not result:
+        masks = view.masks
+        for i, p in enumerate(view.possible_masks):
+            if playable_mask(p, masks) and not result:
                 result = Action(Action.ActionType.PLAY, cnr=i)
-            if discardable(p, board):
+            if discardable_mask(p, masks):
                 discards.append(i)
 
         if discards and hints < 8 and not result:
-            result = Action(Action.ActionType.DISCARD, cnr=random.choice(discards))
+            result = Action(Action.ActionType.DISCARD, cnr=self.rng.choice(discards))
 
         intentions = self.generate_intents(board, hands, pnr, trash)
 
@@ -107,13 +104,8 @@ class SelfIntentionalPlayerWithMemory(Player):
         self.explanation.append(
             ["My Knowledge"] + list(map(format_knowledge, knowledge[pnr]))
         )
-        possible = [
-            Action(Action.ActionType.DISCARD, cnr=i)
-            for i in list(range(self._hand_size))
-        ]
-
-        scores = list(
-            map(lambda p: pretend_discard(p, knowledge[pnr], board, trash), possible)
+        scores = pretend_discards(
+            knowledge[pnr][: self._hand_size], board, trash, unseen=view.unseen
         )
 
         def format_term(x):
@@ -167,35 +159,13 @@ class SelfIntentionalPlayerWithMemory(Player):
         valid: list[
             tuple[tuple[Action.ActionType, int | Color], int, list[int | None]]
         ] = []
-        action: tuple[Action.ActionType, int | Color]
-        for c in Color:
-            action = (Action.ActionType.HINT_COLOR, c)
-            (isvalid, score, expl) = pretend(
-                action, knowledge[1 - nr], intentions, hands[1 - nr], board, trash
-            )
-
-            if isvalid and all(
-                _intent_unchanged(self._intents_conveyed[i], expl[i])
-                for i in range(len(expl))
-            ):
-                isvalid = False
-                score = 0
-                expl = ["No new intentions"]
-
-            self.explanation.append(
-                ["Prediction for: Hint Color " + c.display_name]
-                + list(map(format_intention, expl))
-            )
-
-            if isvalid:
-                assert all(isinstance(x, Intent) or x is None for x in expl)
-                valid.append((action, score, expl))
-        for rank in range(5):
-            rank += 1
-            action = (Action.ActionType.HINT_NUMBER, rank)
-
-            (isvalid, score, expl) = pretend(
-                action, knowledge[1 - nr], intentions, hands[1 - nr], board, trash
+        for prediction in pretend_all(
+            hands, knowledge, intentions, board, trash, [1 - nr]
+        ):
+            isvalid, score, expl = (
+                prediction.valid,
+                prediction.score,
+                prediction.predictions,
             )
 
             if isvalid and all(
@@ -207,13 +177,13 @@ class SelfIntentionalPlayerWithMemory(Player):
                 expl = ["No new intentions"]
 
             self.explanation.append(
-                ["Prediction for: Hint Rank " + str(rank)]
+                ["Prediction for: " + format_hint(prediction.hint)]
                 + list(map(format_intention, expl))
             )
 
             if isvalid:
                 assert all(isinstance(x, Intent) or x is None for x in expl)
-                valid.append((action, score, expl))
+                valid.append((prediction.hint, score, expl))
         if valid and not result:
             valid.sort(key=lambda x: x[1], reverse=True)
             (a, s, expl) = valid[0]
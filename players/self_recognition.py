@@ -1,9 +1,28 @@
-import random
+from concurrent.futures import Future, ProcessPoolExecutor
 from typing import override, Final
+import atexit
+import collections
 import copy
+import itertools
+import random
 
-from players import Player
-from utils import get_possible, playable, Action, discardable, Color, COUNTS, iscard
+import numpy as np
+
+from players import Player, ViewPlayer
+from turn import TurnArgs, TurnView
+from utils import (
+    Action,
+    Color,
+    COUNTS,
+    NUM_CARD_IDS,
+    card_counts,
+    card_from_id,
+    card_id,
+    get_possible_ids,
+    iscard,
+    playable_mask,
+    discardable_mask,
+)
 
 from players.outer_state import OuterStatePlayer
 
@@ -46,11 +65,338 @@ def generate_hands_simple(knowledge):
                     yield [(col, i + 1)] + other
 
 
-class SelfRecognitionPlayer(Player):
+def deal_weight(hand, remaining) -> int:
+    """
+    The number of ways to deal `hand` from the `remaining` copies of each card id.
+    """
+    taken: dict[int, int] = {}
+    weight = 1
+    for card in hand:
+        cid = card_id(card)
+        n = taken.get(cid, 0)
+        weight *= int(remaining[cid]) - n
+        if weight <= 0:
+            return 0
+        taken[cid] = n + 1
+    return weight
+
+
+def generate_hands_counted(knowledge, remaining, symmetry=None):
+    """
+    Enumerate the hands that are consistent with `knowledge`, a card knowledge
+    structure per card, and with `remaining`, the number of copies of each card id
+    that are not known to be elsewhere (in the trash, on the board or in another
+    player's hand).
+
+    Yields (hand, weight) pairs, where the hand is a tuple of cards and the weight is
+    the number of ways to deal it from the remaining copies, so that each hand can
+    be weighed by how likely it is. A partial hand that uses more copies of a card
+    than remain is not extended any further.
+
+    If a `ColorSymmetry` is given, only the canonical hands of its classes are
+    enumerated, i.e. a color of a group is only used once the colors before it in the
+    group have been.
+    """
+    candidates = [
+        [(cid, card_from_id(cid)) for cid in get_possible_ids(k) if remaining[cid] > 0]
+        for k in knowledge
+    ]
+    left = [int(n) for n in remaining]
+    hand: list = [None] * len(candidates)
+    # for each color of a group, the group and the color's position in it, and for
+    # each group the number of its colors in the partial hand
+    groups = symmetry.groups if symmetry is not None else []
+    slots = {
+        col: (g, pos) for g, group in enumerate(groups) for pos, col in enumerate(group)
+    }
+    used = [0] * len(groups)
+
+    def extend(i, weight):
+        if i == len(candidates):
+            yield tuple(hand), weight
+            return
+        for cid, card in candidates[i]:
+            n = left[cid]
+            if not n:
+                continue
+            g, pos = slots.get(card[0], (None, 0))
+            if g is not None:
+                if pos > used[g]:
+                    continue
+                if pos == used[g]:
+                    used[g] += 1
+                else:
+                    g = None
+            left[cid] = n - 1
+            hand[i] = card
+            yield from extend(i + 1, weight * n)
+            left[cid] = n
+            if g is not None:
+                used[g] -= 1
+
+    return extend(0, 1)
+
+
+class HandMarginals:
+    """
+    For each card of a hand, the weighted number of times each card id was seen in
+    that position among the hands added so far. Only these counts are kept, not the
+    hands, so the memory used does not grow with the number of hands.
+    """
+
+    def __init__(self, handsize: int) -> None:
+        self.hands = 0
+        self.counts = [[0] * NUM_CARD_IDS for _ in range(handsize)]
+        # the number of hands added before each card id was first seen in a position,
+        # which breaks ties between equally likely cards in favour of the first seen
+        self.first = [[0] * NUM_CARD_IDS for _ in range(handsize)]
+
+    def add(self, hand, weight: int = 1) -> None:
+        for counts, first, card in zip(self.counts, self.first, hand):
+            cid = card_id(card)
+            if not counts[cid]:
+                first[cid] = self.hands
+            counts[cid] += weight
+        self.hands += 1
+
+    def merge(self, other: "HandMarginals") -> None:
+        """
+        Add the hands counted by `other`, as though they were added after the hands
+        added to this one so far.
+        """
+        for counts, first, other_counts, other_first in zip(
+            self.counts, self.first, other.counts, other.first
+        ):
+            for cid, cnt in enumerate(other_counts):
+                if cnt:
+                    if not counts[cid]:
+                        first[cid] = self.hands + other_first[cid]
+                    counts[cid] += cnt
+        self.hands += other.hands
+
+    def most_likely(self) -> list[tuple]:
+        """
+        The most likely card in each position, and its count, as (card, count) pairs.
+        """
+        result: list[tuple] = []
+        for counts, first in zip(self.counts, self.first):
+            best = None
+            for cid, cnt in enumerate(counts):
+                if cnt and (
+                    best is None
+                    or cnt > counts[best]
+                    or (cnt == counts[best] and first[cid] < first[best])
+                ):
+                    best = cid
+            if best is None:
+                result.append((0, 0))
+            else:
+                result.append((card_from_id(best), counts[best]))
+        return result
+
+
+class ColorSymmetry:
+    """
+    The groups of colors that a position treats alike, so that a hand and the hands
+    made from it by swapping colors within a group lead to the same decisions.
+    Hypotheses about a hand then only need to be checked for one canonical hand per
+    class of equivalent hands.
+
+    Partners break ties between colors by their order, e.g. between equally good
+    hints, so the decisions for equivalent hands can still differ in such ties.
+    """
+
+    def __init__(self, groups) -> None:
+        self.groups = [sorted(group) for group in groups if len(group) > 1]
+
+    @classmethod
+    def of(cls, counts, knowledge, fixed=()) -> "ColorSymmetry":
+        """
+        The symmetry of a position in which colors can only be told apart by
+        `counts`, vectors indexed by card id, by `knowledge`, card knowledge
+        structures, and by being one of the `fixed` colors, which are never swapped
+        (e.g. because they are visible in a hand).
+        """
+        counts = [np.asarray(c).reshape(len(Color), -1).tolist() for c in counts]
+        knowledge = [np.asarray(k).tolist() for k in knowledge]
+        groups: dict[tuple, list[Color]] = {}
+        for col in Color:
+            if col in fixed:
+                key: tuple = (col,)
+            else:
+                key = (
+                    tuple(tuple(c[col]) for c in counts),
+                    tuple(tuple(k[col]) for k in knowledge),
+                )
+            groups.setdefault(key, []).append(col)
+        return cls(groups.values())
+
+    def widen(self, counts):
+        """
+        `counts`, a vector indexed by card id, with the count of each card raised to
+        the largest count of its rank among the colors of its group. Every class of
+        hands that can be dealt from `counts` then has its canonical hand among the
+        hands that can be dealt from the widened counts.
+        """
+        if not self.groups:
+            return counts
+        widened = np.array(counts)
+        for group in self.groups:
+            rows = [col * 5 + np.arange(5) for col in group]
+            largest = np.max([widened[row] for row in rows], axis=0)
+            for row in rows:
+                widened[row] = largest
+        return widened
+
+    def _renaming(self, hand) -> dict[Color, Color]:
+        # renames the colors of each group in the order they first appear in the hand
+        renaming: dict[Color, Color] = {}
+        for group in self.groups:
+            used = list(dict.fromkeys(col for col, _ in hand if col in group))
+            renaming.update(zip(used, group))
+        return renaming
+
+    def canonical(self, hand) -> tuple:
+        """
+        The canonical hand of the class of `hand`.
+        """
+        renaming = self._renaming(hand)
+        return tuple((renaming.get(col, col), num) for col, num in hand)
+
+    def orbit(self, hand) -> list[tuple]:
+        """
+        All hands equivalent to `hand`, including itself.
+        """
+        choices = []
+        for group in self.groups:
+            used = list(dict.fromkeys(col for col, _ in hand if col in group))
+            choices.append(
+                [
+                    dict(zip(used, renamed))
+                    for renamed in itertools.permutations(group, len(used))
+                ]
+            )
+        hands = []
+        for renamings in itertools.product(*choices):
+            renaming = {k: v for r in renamings for k, v in r.items()}
+            hands.append(tuple((renaming.get(col, col), num) for col, num in hand))
+        return hands
+
+
+def hint_symmetry(partner: TurnView, nr: int, hint: Action, knowledge=()):
+    """
+    The symmetry of the hypotheses about the hand of player `nr` after the `hint`
+    their partner gave on the turn seen by `partner`. A hypothesis is judged by what
+    the partner would have done in their place, so the colors must be alike in what
+    the partner saw, apart from the hand of player `nr` itself (and the partner's
+    own hand, which players do not look at), and in `knowledge`, e.g. the player's
+    own card knowledge structures. The colors of the other hands the partner saw and
+    a hinted color are never swapped.
+    """
+    fixed = {
+        col
+        for i, hand in enumerate(partner.hands)
+        if i not in (nr, partner.nr)
+        for col, _ in hand
+    }
+    if hint.action_type == Action.ActionType.HINT_COLOR:
+        fixed.add(hint.col)
+    return ColorSymmetry.of(
+        [card_counts(partner.trash), card_counts(partner.board)],
+        [*knowledge, *(k for cards in partner.knowledge for k in cards)],
+        fixed,
+    )
+
+
+def count_explained(marginals, hand, weight, symmetry, remaining) -> None:
+    """
+    Add `hand`, which explains a hint and was dealt `weight` ways, to `marginals`.
+    If it is the canonical hand of a class of `symmetry`, every hand of the class is
+    added instead, with the number of ways it can be dealt from `remaining`.
+    """
+    if not symmetry.groups:
+        marginals.add(hand, weight)
+        return
+    for g in symmetry.orbit(hand):
+        w = deal_weight(g, remaining)
+        if w:
+            marginals.add(g, w)
+
+
+# the number of hands checked at a time, each chunk with its own seed for the
+# partner model; the results do not depend on the number of workers, only on this
+CHUNK_SIZE = 2000
+
+# the pools of worker processes, by number of workers, shared by all players
+_executors: dict[int, ProcessPoolExecutor] = {}
+
+# the partner models of a worker process, by class and player number, which are
+# reset before each hand rather than created anew
+_partners: dict[tuple[type[Player], int], Player] = {}
+
+
+def hypothesis_executor(workers: int) -> ProcessPoolExecutor:
+    """
+    The pool of `workers` processes that check hypotheses for the players that use
+    that many workers, created on first use.
+    """
+    executor = _executors.get(workers)
+    if executor is None:
+        executor = _executors[workers] = ProcessPoolExecutor(max_workers=workers)
+    return executor
+
+
+@atexit.register
+def shutdown_executors() -> None:
+    """
+    Shut down the pools of worker processes, which happens at exit at the latest.
+    """
+    while _executors:
+        _executors.popitem()[1].shutdown()
+
+
+def explain_hands(
+    other: type[Player],
+    partner: TurnArgs,
+    nr: int,
+    hint: Action,
+    hands,
+    symmetry: ColorSymmetry,
+    remaining,
+    seed: int,
+) -> tuple[HandMarginals, int]:
+    """
+    Check which of `hands`, (hand, weight) pairs for the hand of player `nr`, would
+    have led a player of class `other` to give `hint` on the turn described by
+    `partner`, with a partner model whose randomness is seeded with `seed`. Run in a
+    worker process, or in this one if the player has a single worker.
+
+    Returns the marginals of the hands that explain the hint (see `count_explained`)
+    and the number of hands that do not.
+    """
+    model = _partners.get((other, partner.nr))
+    if model is None:
+        model = _partners[other, partner.nr] = other("Pinocchio", partner.nr)
+    model.rng = random.Random(seed)
+    view = TurnView(*partner)
+    marginals = HandMarginals(len(partner.knowledge[nr]))
+    wrong = 0
+    for h, weight in hands:
+        newhands = list(partner.hands)
+        newhands[nr] = h
+        model.reset()
+        if model.act(view.replace(hands=newhands)) == hint:
+            count_explained(marginals, h, weight, symmetry, remaining)
+        else:
+            wrong += 1
+    return marginals, wrong
+
+
+class SelfRecognitionPlayer(ViewPlayer):
     gothint: tuple[Action, int] | None
     other: Final[type[Player]]
 
-    def __init__(self, name, pnr, other=OuterStatePlayer):
+    def __init__(self, name, pnr, other=OuterStatePlayer, workers=1):
         super().__init__(name, pnr)
         self.hints = {}
         self.gothint = None
@@ -58,6 +404,9 @@ class SelfRecognitionPlayer(Player):
         self.last_played = []
         self.last_board = []
         self.other = other
+        # with more than one worker, the hands that could explain a hint are checked
+        # in that many worker processes, see explain_hint
+        self.workers = workers
 
     @override
     def reset(self) -> None:
@@ -67,54 +416,100 @@ class SelfRecognitionPlayer(Player):
         self.last_played = []
         self.last_board = []
 
-    def get_action(
-        self, nr, hands, knowledge, trash, played, board, valid_actions, hints
-    ):
+    def explain_hint(
+        self, partner, nr, hint, hands_counted, symmetry, remaining, marginals
+    ) -> int:
+        """
+        Check the (hand, weight) pairs of `hands_counted` for the hand of player `nr`
+        in chunks of `CHUNK_SIZE` hands, see `explain_hands`, and merge the marginals
+        of the hands that explain the `hint` into `marginals`. Returns the number of
+        hands that do not.
+
+        Each chunk is seeded from this player's rng in the order of the hands, with
+        one worker or many. With more than one, the chunks are checked in the worker
+        processes with at most two chunks per worker in flight, so that the hands are
+        enumerated as the workers get to them rather than all at once, and merged in
+        the order of the hands, as though they were checked here.
+        """
+        args = TurnArgs(*partner)
+        chunks = (
+            (self.other, args, nr, hint, chunk, symmetry, remaining)
+            for chunk in itertools.batched(hands_counted, CHUNK_SIZE)
+        )
+        wrong = 0
+        if self.workers <= 1:
+            for chunk_args in chunks:
+                chunk_marginals, chunk_wrong = explain_hands(
+                    *chunk_args, self.rng.getrandbits(64)
+                )
+                marginals.merge(chunk_marginals)
+                wrong += chunk_wrong
+            return wrong
+
+        executor = hypothesis_executor(self.workers)
+        pending: collections.deque[Future] = collections.deque()
+
+        def merge_next():
+            nonlocal wrong
+            chunk_marginals, chunk_wrong = pending.popleft().result()
+            marginals.merge(chunk_marginals)
+            wrong += chunk_wrong
+
+        for chunk_args in chunks:
+            if len(pending) >= 2 * self.workers:
+                merge_next()
+            pending.append(
+                executor.submit(explain_hands, *chunk_args, self.rng.getrandbits(64))
+            )
+        while pending:
+            merge_next()
+        return wrong
+
+    @override
+    def act(self, view: TurnView) -> Action:
+        (nr, hands, knowledge, trash, played, board, valid_actions, hints) = view
         handsize = len(knowledge[0])
-        possible = []
 
         if self.gothint:
-            possiblehands = []
+            marginals = HandMarginals(len(knowledge[nr]))
             wrong = 0
-            used: dict[tuple[int, int], int] = {}
-            for c in Color:
-                for i, cnt in enumerate(COUNTS):
-                    used[(c, i + 1)] = 0
-            for c_tup in trash + played:
-                used[c_tup] += 1
-
-            for h in generate_hands_simple(knowledge[nr]):
-                newhands = hands[:]
-                newhands[nr] = h
-                other = self.other("Pinocchio", self.gothint[1])
-                act = other.get_action(
-                    self.gothint[1],
-                    newhands,
-                    self.last_knowledge,
-                    self.last_trash,
-                    self.last_played,
-                    self.last_board,
-                    valid_actions,
-                    hints + 1,
-                )
-                lastact = self.gothint[0]
-                if act == lastact:
-                    possiblehands.append(h)
-                else:
-                    wrong += 1
-            # print(len(possiblehands), "would have led to", self.gothint[0], "and not:", wrong)
-            # print(f(possiblehands))
-            if possiblehands:
-                mostlikely = [(0, 0) for i in range(len(possiblehands[0]))]
-                for i in range(len(possiblehands[0])):
-                    counts = {}
-                    for h in possiblehands:
-                        if h[i] not in counts:
-                            counts[h[i]] = 0
-                        counts[h[i]] += 1
-                    for c in counts:
-                        if counts[c] > mostlikely[i][1]:
-                            mostlikely[i] = (c, counts[c])
+            remaining = view.unseen.copy()
+            for i, h in enumerate(hands):
+                if i != nr:
+                    for card in h:
+                        remaining[card_id(card)] -= 1
+
+            # the turn of the partner who gave the hint, as they saw it; only the
+            # guess of this player's hand changes from one simulation to the next
+            partner = TurnView(
+                self.gothint[1],
+                hands,
+                self.last_knowledge,
+                self.last_trash,
+                self.last_played,
+                self.last_board,
+                valid_actions,
+                hints + 1,
+            )
+            # only one hand of each class of hands that are the same up to swapping
+            # interchangeable colors is simulated; if it explains the hint, each hand
+            # of its class is counted with the number of ways it can be dealt
+            symmetry = hint_symmetry(partner, nr, self.gothint[0], knowledge[nr])
+            hands_counted = generate_hands_counted(
+                knowledge[nr], symmetry.widen(remaining), symmetry
+            )
+            wrong += self.explain_hint(
+                partner,
+                nr,
+                self.gothint[0],
+                hands_counted,
+                symmetry,
+                remaining,
+                marginals,
+            )
+            # print(marginals.hands, "would have led to", self.gothint[0], "and not:", wrong)
+            if marginals.hands:
+                mostlikely = marginals.most_likely()
                 # print("most likely:", mostlikely)
                 m = max(mostlikely, key=lambda x: x[1])
                 second = mostlikely[:]
@@ -124,28 +519,21 @@ class SelfRecognitionPlayer(Player):
                     # print(">>>>>>> deduced!", f(m[0]), m[1],"vs", f(m2[0]), m2[1])
                     knowledge = copy.deepcopy(knowledge)
                     knowledge[nr][mostlikely.index(m)] = iscard(m[0])
+                    view = view.replace(knowledge=knowledge)
 
         self.gothint = None
-        for k in knowledge[nr]:
-            possible.append(get_possible(k))
-
         discards = []
-        for i, p in enumerate(possible):
-            if playable(p, board):
+        masks = view.masks
+        for i, p in enumerate(view.possible_masks):
+            if playable_mask(p, masks):
                 return Action(Action.ActionType.PLAY, cnr=i)
-            if discardable(p, board):
+            if discardable_mask(p, masks):
                 discards.append(i)
 
         if discards:
-            return Action(Action.ActionType.DISCARD, cnr=random.choice(discards))
-
-        playables = []
-        for i, h in enumerate(hands):
-            if i != nr:
-                for j, (col, n) in enumerate(h):
-                    if board[col][1] + 1 == n:
-                        playables.append((i, j))
-        playables.sort(key=lambda x: -hands[x[0]][x[1]][1])
+            return Action(Action.ActionType.DISCARD, cnr=self.rng.choice(discards))
+
+        playables = sorted(view.playables, key=lambda x: -hands[x[0]][x[1]][1])
         while playables and hints > 0:
             i, j = playables[0]
 
@@ -169,7 +557,7 @@ class SelfRecognitionPlayer(Player):
             if i == nr:
                 continue
             cards = list(range(len(k)))
-            random.shuffle(cards)
+            self.rng.shuffle(cards)
             card = cards[0]
             (col, num) = hands[i][card]
             hinttype = [Action.ActionType.HINT_COLOR, Action.ActionType.HINT_NUMBER]
@@ -178,14 +566,14 @@ class SelfRecognitionPlayer(Player):
             for h in self.hints[(card, i)]:
                 hinttype.remove(h)
             if hinttype and hints > 0:
-                if random.choice(hinttype) == Action.ActionType.HINT_COLOR:
+                if self.rng.choice(hinttype) == Action.ActionType.HINT_COLOR:
                     self.hints[(card, i)].append(Action.ActionType.HINT_COLOR)
                     return Action(Action.ActionType.HINT_COLOR, pnr=i, col=col)
                 else:
                     self.hints[(card, i)].append(Action.ActionType.HINT_NUMBER)
                     return Action(Action.ActionType.HINT_NUMBER, pnr=i, num=num)
 
-        return random.choice(
+        return self.rng.choice(
             [Action(Action.ActionType.DISCARD, cnr=i) for i in list(range(handsize))]
         )
 
@@ -0,0 +1,317 @@
+"""
+Run many simulated games, optionally spread over a pool of worker processes.
+
+Only player specs (the strings accepted by `hanabi.make_player`) and seeds are sent
+to the workers, which build their own players. Every game gets a fresh set of
+players and a `random.Random` seeded with the game's seed, so its result does not
+depend on which worker plays it or in what order.
+"""
+
+import contextlib
+import random
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, NamedTuple, Sequence
+
+from game import Game, HanasimGame
+from stats import RunningStats, Summary, difference
+from decks import open_corpus
+from utils import NullStream, make_deck
+
+ENGINES = ("hanasim", "native")
+
+
+class GameResult(NamedTuple):
+    seed: int
+    players: tuple[str, ...]  # the player specs
+    engine: str
+    score: int
+    turns: int
+    seconds: float
+    # the post-move metrics of HanasimGame, with one entry per player for each
+    # metric, or None if they were not collected
+    metrics: dict[str, list] | None
+    # whether the game was dealt the seed's deck in reverse order, see play_game
+    reversed_deck: bool = False
+    # the deck corpus the game was dealt from, see play_game
+    decks: str | None = None
+
+
+def play_game(
+    specs: Sequence[str],
+    seed: int,
+    engine: str = "hanasim",
+    post_move_metrics: bool = False,
+    verbose: bool = False,
+    reversed_deck: bool = False,
+    decks: str | None = None,
+) -> GameResult:
+    """
+    Play a single game between the players described by `specs`.
+
+    The native engine shuffles the deck with the seed before any player draws from
+    it, so every game with the same seed is dealt the same deck, whoever plays it.
+    With `reversed_deck` that deck is dealt in reverse order instead, meant as an
+    antithetic counterpart to the seed's game, although the scores of the two are
+    hardly correlated. With `decks`, the path of a deck
+    corpus (see `decks.py`), game n is dealt the corpus deck with index n - 1
+    instead, as games are numbered from 1.
+    """
+    from hanabi import make_player  # hanabi imports this module
+
+    log = sys.stdout if verbose else NullStream()
+    rng = random.Random(seed)
+    players = [make_player(spec, i) for i, spec in enumerate(specs)]
+    if engine == "native":
+        if post_move_metrics:
+            raise ValueError("Post-move metrics are only collected by HanaSim games")
+        deck = make_deck(rng) if decks is None else open_corpus(decks)[seed - 1]
+        if reversed_deck:
+            deck.reverse()
+        g: Game | HanasimGame = Game(players, log, rng=rng, deck=deck)
+    elif engine == "hanasim":
+        if reversed_deck or decks is not None:
+            raise ValueError("HanaSim deals its own decks, which cannot be chosen")
+        g = HanasimGame(players, log, post_move_metrics, rng=rng)
+    else:
+        raise ValueError(f"Unknown engine: {engine}")
+
+    t0 = time.perf_counter()
+    score = g.run()
+    seconds = time.perf_counter() - t0
+    metrics = None
+    if isinstance(g, HanasimGame) and post_move_metrics:
+        # lists rather than Counters, so that results can be stored as JSON
+        metrics = {
+            name: [values[i] for i in range(len(players))]
+            for name, values in g.metric_dict.items()
+        }
+    return GameResult(
+        seed,
+        tuple(specs),
+        engine,
+        score,
+        g.turn - 1,
+        seconds,
+        metrics,
+        reversed_deck,
+        decks,
+    )
+
+
+def play_games(
+    specs: Sequence[str],
+    seeds: Sequence[int],
+    engine: str = "hanasim",
+    post_move_metrics: bool = False,
+    verbose: bool = False,
+    reversed_deck: bool = False,
+    decks: str | None = None,
+) -> list[GameResult]:
+    """
+    Play one game per seed in this process; the unit of work sent to a worker.
+    """
+    return [
+        play_game(specs, seed, engine, post_move_metrics, verbose, reversed_deck, decks)
+        for seed in seeds
+    ]
+
+
+def iter_games(
+    specs: Sequence[str],
+    seeds: Iterable[int],
+    workers: int = 1,
+    engine: str = "hanasim",
+    post_move_metrics: bool = False,
+    verbose: bool = False,
+    progress: Callable[[int], None] | None = None,
+    reversed_deck: bool = False,
+    decks: str | None = None,
+    executor: Executor | None = None,
+) -> Iterator[GameResult]:
+    """
+    Play one game per seed and yield the results in the order of `seeds`, as soon
+    as they are available.
+
+    With `workers` > 1 the seeds are split into contiguous chunks that are played by
+    `executor`, or by a `ProcessPoolExecutor` started for these games if it is None.
+    `progress`, if given, is called with the number of games finished so far after
+    every game (or chunk, when using workers).
+    """
+    seeds = list(seeds)
+    if workers <= 1:
+        for done, seed in enumerate(seeds, 1):
+            yield play_game(
+                specs, seed, engine, post_move_metrics, verbose, reversed_deck, decks
+            )
+            if progress is not None:
+                progress(done)
+        return
+
+    # several chunks per worker, so that a slow chunk does not hold up the others
+    size = max(1, len(seeds) // (workers * 4))
+    chunks = [seeds[i : i + size] for i in range(0, len(seeds), size)]
+    with contextlib.ExitStack() as stack:
+        if executor is None:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+        futures = [
+            executor.submit(
+                play_games,
+                specs,
+                chunk,
+                engine,
+                post_move_metrics,
+                verbose,
+                reversed_deck,
+                decks,
+            )
+            for chunk in chunks
+        ]
+        # collect in submission order, which keeps the results in seed order
+        done = 0
+        for future in futures:
+            chunk_results = future.result()
+            yield from chunk_results
+            done += len(chunk_results)
+            if progress is not None:
+                progress(done)
+
+
+def run_games(
+    specs: Sequence[str],
+    seeds: Iterable[int],
+    workers: int = 1,
+    engine: str = "hanasim",
+    post_move_metrics: bool = False,
+    verbose: bool = False,
+    progress: Callable[[int], None] | None = None,
+    reversed_deck: bool = False,
+    decks: str | None = None,
+) -> list[GameResult]:
+    """
+    Like `iter_games`, but return all results at once.
+    """
+    return list(
+        iter_games(
+            specs,
+            seeds,
+            workers,
+            engine,
+            post_move_metrics,
+            verbose,
+            progress,
+            reversed_deck,
+            decks,
+        )
+    )
+
+
+def seed_scores(results: Iterable[GameResult]) -> dict[int, float]:
+    """
+    The score of every seed in `results`, averaged over the games played on it
+    (its deck and, with antithetic runs, the reversed deck).
+    """
+    games: dict[int, list[int]] = {}
+    for result in results:
+        games.setdefault(result.seed, []).append(result.score)
+    return {seed: sum(scores) / len(scores) for seed, scores in games.items()}
+
+
+def run_sequential(
+    treatments: Sequence[Sequence[str]],
+    seeds: Iterable[int],
+    precision: float,
+    batch_size: int = 100,
+    min_games: int = 100,
+    confidence: float = 0.95,
+    workers: int = 1,
+    engine: str = "hanasim",
+    post_move_metrics: bool = False,
+    paired: bool = False,
+    antithetic: bool = False,
+    decks: str | None = None,
+    record: Callable[[GameResult], None] | None = None,
+    progress: Callable[[list[Summary]], None] | None = None,
+) -> list[list[GameResult]]:
+    """
+    Play every treatment (a list of player specs) on the same seeds, a batch at a
+    time, until the confidence interval is narrow enough: for a single treatment
+    when the half-width of the interval around its mean score is at most
+    `precision`, for two when that of the difference of their means is. Stops after
+    `min_games` seeds at the earliest, and when the seeds run out at the latest.
+
+    With `paired`, the difference of two treatments is estimated from the
+    differences of their scores on each seed, i.e. on the same deck. With
+    `antithetic`, every seed is also played with its deck reversed, and the average
+    of the two scores counts as the seed's score; as the two scores are hardly
+    correlated, this reduces the variance little more than playing twice as many
+    seeds would. Both need the native engine, and
+    so does playing from the deck corpus `decks` (see `play_game`).
+
+    `record`, if given, is called with every result, and `progress` with the
+    summaries of the treatments (and of the paired difference) after every batch.
+    Returns the results of each treatment.
+    """
+    if not 1 <= len(treatments) <= 2:
+        raise ValueError("Sequential runs compare one or two treatments")
+    if paired and len(treatments) != 2:
+        raise ValueError("A paired comparison needs two treatments")
+    if (paired or antithetic) and engine != "native":
+        raise ValueError("HanaSim deals its own decks, so games cannot be paired")
+    seeds = list(seeds)
+    results: list[list[GameResult]] = [[] for _ in treatments]
+    stats = [RunningStats() for _ in treatments]
+    differences = RunningStats()
+    with contextlib.ExitStack() as stack:
+        # one pool of workers for all batches, rather than one per batch
+        executor = None
+        if workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+        for start in range(0, len(seeds), batch_size):
+            batch = seeds[start : start + batch_size]
+            reversals = [False, True] if antithetic else [False]
+            scores = []
+            for specs, played, stat in zip(treatments, results, stats):
+                batch_results = [
+                    result
+                    for reversed_deck in reversals
+                    for result in iter_games(
+                        specs,
+                        batch,
+                        workers,
+                        engine,
+                        post_move_metrics,
+                        reversed_deck=reversed_deck,
+                        decks=decks,
+                        executor=executor,
+                    )
+                ]
+                played += batch_results
+                if record is not None:
+                    for result in batch_results:
+                        record(result)
+                batch_scores = seed_scores(batch_results)
+                for seed in batch:
+                    stat.add(batch_scores[seed])
+                scores.append(batch_scores)
+            if paired:
+                for seed in batch:
+                    differences.add(scores[0][seed] - scores[1][seed])
+
+            summaries = [stat.summary(confidence) for stat in stats]
+            if paired:
+                summaries.append(differences.summary(confidence))
+            if progress is not None:
+                progress(summaries)
+            if paired:
+                half_width = summaries[2].half_width
+            elif len(treatments) == 2:
+                half_width = difference(
+                    summaries[0], summaries[1], confidence
+                ).half_width
+            else:
+                half_width = summaries[0].half_width
+            if summaries[0].n >= min_games and half_width <= precision:
+                break
+    return results
@@ -0,0 +1,88 @@
+"""
+Summary statistics for the scores of simulated games.
+"""
+
+import math
+from statistics import NormalDist
+from typing import Iterable, NamedTuple
+
+
+def z_value(confidence: float) -> float:
+    """
+    The two-sided critical value of the normal distribution for `confidence`, e.g.
+    1.96 for 0.95.
+    """
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+class Summary(NamedTuple):
+    n: int
+    mean: float
+    stddev: float
+    # half the width of the confidence interval around the mean
+    half_width: float
+
+    @property
+    def low(self) -> float:
+        return self.mean - self.half_width
+
+    @property
+    def high(self) -> float:
+        return self.mean + self.half_width
+
+    def __str__(self) -> str:
+        return f"{self.mean:.2f} ± {self.half_width:.2f}"
+
+
+def summarize(values: Iterable[float], confidence: float = 0.95) -> Summary:
+    """
+    The mean of `values` with its sample standard deviation and a normal
+    approximation confidence interval.
+    """
+    return RunningStats(values).summary(confidence)
+
+
+class RunningStats:
+    """
+    The mean and variance of a stream of values, updated one value at a time with
+    Welford's algorithm.
+    """
+
+    __slots__ = ("n", "mean", "_m2")
+
+    def __init__(self, values: Iterable[float] = ()) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        for value in values:
+            self.add(value)
+
+    def add(self, value: float) -> None:
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    def summary(self, confidence: float = 0.95) -> Summary:
+        if self.n == 0:
+            return Summary(0, math.nan, math.nan, math.nan)
+        if self.n == 1:
+            return Summary(1, self.mean, math.nan, math.inf)
+        stddev = math.sqrt(self.variance)
+        half_width = z_value(confidence) * stddev / math.sqrt(self.n)
+        return Summary(self.n, self.mean, stddev, half_width)
+
+
+def difference(a: Summary, b: Summary, confidence: float = 0.95) -> Summary:
+    """
+    The difference of the means of two independent samples, a - b, with its
+    confidence interval.
+    """
+    n = min(a.n, b.n)
+    stddev = math.sqrt(a.stddev**2 + b.stddev**2)
+    half_width = z_value(confidence) * math.sqrt(a.stddev**2 / a.n + b.stddev**2 / b.n)
+    return Summary(n, a.mean - b.mean, stddev, half_width)
@@ -0,0 +1,132 @@
+"""
+An on-disk record of simulation results, so that long runs can be resumed.
+
+Results are appended to a JSON Lines file, one `GameResult` per line, and written
+out as soon as each game finishes. A run that is interrupted loses at most the line
+that was being written, which is dropped when the store is opened again.
+"""
+
+import json
+import os
+from typing import Iterable, Iterator, Sequence, TextIO
+
+from runner import GameResult
+
+
+class ResultStore:
+    """
+    An append-only JSON Lines file of game results. Use it as a context manager to
+    append results:
+
+        with ResultStore("results.jsonl") as store:
+            for result in iter_games(specs, seeds):
+                store.append(result)
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file: TextIO | None = None
+
+    def __enter__(self) -> "ResultStore":
+        self._drop_partial_line()
+        self._file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _drop_partial_line(self) -> None:
+        """
+        Cut off a last line that was not completely written, e.g. because the run
+        writing it was killed.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            if not end:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b"\n":
+                return
+            # look for the end of the last complete line, a block at a time from the
+            # end, so that only the partial line is read
+            pos = end
+            while pos:
+                start = max(pos - 4096, 0)
+                f.seek(start)
+                newline = f.read(pos - start).rfind(b"\n")
+                if newline >= 0:
+                    f.truncate(start + newline + 1)
+                    return
+                pos = start
+            f.truncate(0)
+
+    def append(self, result: GameResult) -> None:
+        if self._file is None:
+            raise RuntimeError("ResultStore must be opened before appending to it")
+        self._file.write(json.dumps(result._asdict()) + "\n")
+        self._file.flush()
+
+    def record(self, results: Iterable[GameResult]) -> Iterator[GameResult]:
+        """
+        Append every result of `results` as it passes through.
+        """
+        for result in results:
+            self.append(result)
+            yield result
+
+    def __iter__(self) -> Iterator[GameResult]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # a partial line, see _drop_partial_line
+                record = json.loads(line)
+                record["players"] = tuple(record["players"])
+                yield GameResult(**record)
+
+    def results(
+        self,
+        specs: Sequence[str],
+        engine: str,
+        seeds: Iterable[int] | None = None,
+        reversed_deck: bool = False,
+        decks: str | None = None,
+    ) -> Iterator[GameResult]:
+        """
+        The stored results of games between `specs` on `engine`, optionally only
+        those for `seeds`. If a seed was played more than once, the first result
+        is used. Games dealt a reversed deck or from a deck corpus are kept apart
+        from the others.
+        """
+        wanted = None if seeds is None else set(seeds)
+        seen = set()
+        for result in self:
+            if (
+                result.players != tuple(specs)
+                or result.engine != engine
+                or result.reversed_deck != reversed_deck
+                or result.decks != decks
+            ):
+                continue
+            if result.seed in seen or (
+                wanted is not None and result.seed not in wanted
+            ):
+                continue
+            seen.add(result.seed)
+            yield result
+
+    def seeds(
+        self, specs: Sequence[str], engine: str, decks: str | None = None
+    ) -> set[int]:
+        """
+        The seeds that already have a result for `specs` on `engine`.
+        """
+        return {result.seed for result in self.results(specs, engine, decks=decks)}
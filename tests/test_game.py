@@ -0,0 +1,101 @@
+import copy
+import random
+
+import numpy as np
+import pytest
+
+from game import Game, VectorGame, uniform_random_policy
+from players import Player
+from utils import NullStream, board_ranks, card_counts, card_from_id, unseen_counts
+
+
+def same_snapshot(a, b) -> bool:
+    return a._replace(knowledge=None) == b._replace(knowledge=None) and all(
+        np.array_equal(x, y) for x, y in zip(a.knowledge, b.knowledge)
+    )
+
+
+def assert_counts_match(game) -> None:
+    # the count arrays the engine keeps up to date match its lists of cards
+    assert list(game.board_ranks) == board_ranks(game.board)
+    assert list(game.played_counts) == card_counts(game.played)
+    assert list(game.trash_counts) == card_counts(game.trash)
+    assert np.array_equal(game.unseen_counts, unseen_counts(game.board, game.trash))
+
+
+@pytest.mark.parametrize("num_players", [2, 3, 4, 5])
+@pytest.mark.parametrize("seed", range(2))
+def test_vector_game_matches_game(num_players, seed):
+    vg = VectorGame(20, num_players, seed=seed)
+    games = [
+        Game(
+            [Player(f"p{i}", i) for i in range(num_players)],
+            NullStream(),
+            deck=[card_from_id(int(cid)) for cid in deck],
+        )
+        for deck in vg.decks
+    ]
+    policy = uniform_random_policy(seed=seed)
+    while not vg.done.all():
+        observation = vg.observe()
+        actions = policy(observation)
+        for g, game in enumerate(games):
+            assert game.done() == vg.done[g]
+            if vg.done[g]:
+                continue
+            legal = np.nonzero(observation.legal_actions[g])[0]
+            assert sorted(vg.action_index(a) for a in game.valid_actions()) == list(
+                legal
+            )
+            game.external_turn(vg.to_action(int(actions[g])))
+        vg.step(actions)
+        for g, game in enumerate(games):
+            for p, hand in enumerate(game.hands):
+                assert [card_from_id(int(c)) for c in vg.hands[g, p] if c >= 0] == hand
+                assert np.array_equal(
+                    vg.knowledge[g, p, : len(hand)], game.knowledge[p]
+                )
+            assert vg.boards[g].tolist() == [rank for _, rank in game.board]
+            assert (vg.hints[g], vg.hits[g]) == (game.hints, game.hits)
+    assert vg.score().tolist() == [game.score() for game in games]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_undo_and_restore(seed):
+    rng = random.Random(seed)
+    players = [Player(f"p{i}", i) for i in range(2 + seed % 2)]
+    game = Game(players, NullStream(), track_undo=True, rng=random.Random(seed))
+    history = []
+    while not game.done():
+        history.append(game.snapshot())
+        for action in game.valid_actions():
+            game.external_turn(action)
+            game.undo()
+            assert same_snapshot(game.snapshot(), history[-1])
+            assert_counts_match(game)
+        game.external_turn(rng.choice(list(game.valid_actions())))
+        assert_counts_match(game)
+    final = game.snapshot()
+    for snapshot in reversed(history):
+        game.undo()
+        assert same_snapshot(game.snapshot(), snapshot)
+        assert_counts_match(game)
+    game.restore(final)
+    assert same_snapshot(game.snapshot(), final)
+    assert_counts_match(game)
+
+
+def test_restore_leaves_the_snapshot_alone():
+    game = Game(
+        [Player("p0", 0), Player("p1", 1)],
+        NullStream(),
+        track_undo=True,
+        rng=random.Random(0),
+    )
+    snapshot = game.snapshot()
+    expected = copy.deepcopy(snapshot)
+    for _ in range(2):
+        game.restore(snapshot)
+        while not game.done():
+            game.external_turn(game.rng.choice(list(game.valid_actions())))
+        assert same_snapshot(snapshot, expected)
@@ -0,0 +1,80 @@
+import collections
+import random
+
+import numpy as np
+import pytest
+
+from players.sampling_recognition import sample_hands
+from players.self_recognition import ColorSymmetry, deal_weight, generate_hands_counted
+from utils import CARD_COPIES, Color, card_id, initial_knowledge
+
+
+def random_position(rng: random.Random, handsize: int):
+    # a hand whose cards were each hinted some colors away, and a few cards seen
+    knowledge = np.array([initial_knowledge() for _ in range(handsize)])
+    for k in knowledge:
+        if rng.random() < 0.5:
+            k *= np.array([[rng.random() < 0.6] for _ in Color])
+    remaining = CARD_COPIES.copy()
+    for _ in range(8):
+        cid = rng.randrange(len(remaining))
+        if remaining[cid]:
+            remaining[cid] -= 1
+    return knowledge, remaining
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_symmetry_matches_full_enumeration(seed):
+    rng = random.Random(seed)
+    knowledge, remaining = random_position(rng, 3)
+    fixed = {Color(rng.randrange(len(Color)))} if seed % 2 else ()
+    symmetry = ColorSymmetry.of([], list(knowledge), fixed=fixed)
+
+    full: collections.Counter = collections.Counter()
+    for hand, weight in generate_hands_counted(knowledge, remaining):
+        full[hand] += weight
+
+    widened = symmetry.widen(remaining)
+    canonical = [
+        hand for hand, _ in generate_hands_counted(knowledge, widened, symmetry)
+    ]
+    assert canonical == [
+        hand
+        for hand, _ in generate_hands_counted(knowledge, widened)
+        if symmetry.canonical(hand) == hand
+    ]
+    reduced: collections.Counter = collections.Counter()
+    for hand in canonical:
+        for other in symmetry.orbit(hand):
+            weight = deal_weight(other, remaining)
+            if weight:
+                reduced[other] += weight
+    assert reduced == full
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sampler_matches_exact_enumeration(seed):
+    rng = random.Random(seed)
+    knowledge, remaining = random_position(rng, 2)
+    exact = {
+        tuple(card_id(card) for card in hand): weight
+        for hand, weight in generate_hands_counted(knowledge, remaining)
+    }
+    total = sum(exact.values())
+    count = 20000
+    samples = sample_hands(knowledge, remaining, count, np.random.default_rng(seed))
+    assert samples.shape == (count, len(knowledge))
+    seen = collections.Counter(tuple(int(cid) for cid in row) for row in samples)
+    assert set(seen) <= set(exact)
+    # every hand's frequency is within five standard deviations of its probability
+    for hand, weight in exact.items():
+        p = weight / total
+        assert abs(seen[hand] - count * p) <= 5 * np.sqrt(count * p * (1 - p)) + 1
+
+
+def test_sampler_without_consistent_hands():
+    knowledge = np.array([initial_knowledge()])
+    samples = sample_hands(
+        knowledge, np.zeros_like(CARD_COPIES), 10, np.random.default_rng()
+    )
+    assert samples.shape == (0, 1)
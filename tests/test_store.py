@@ -0,0 +1,30 @@
+import pytest
+
+from runner import GameResult
+from store import ResultStore
+
+
+def result(seed: int) -> GameResult:
+    return GameResult(seed, ("outer", "outer"), "native", 10 + seed, 60, 0.5, None)
+
+
+@pytest.mark.parametrize("partial", [b"", b'{"seed": 3, "pla', b"x" * 10000])
+def test_partial_last_line_is_dropped(tmp_path, partial):
+    path = tmp_path / "results.jsonl"
+    with ResultStore(str(path)) as store:
+        store.append(result(1))
+        store.append(result(2))
+    with open(path, "ab") as f:
+        f.write(partial)
+
+    with ResultStore(str(path)) as store:
+        store.append(result(3))
+    assert list(ResultStore(str(path))) == [result(1), result(2), result(3)]
+
+
+def test_partial_only_line_is_dropped(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_bytes(b"x" * 10000)
+    with ResultStore(str(path)):
+        pass
+    assert path.read_bytes() == b""
@@ -0,0 +1,109 @@
+"""
+Round-robin cross-play: every pair of AIs plays the same set of decks.
+
+`cross_play` splits every cell of the matrix into chunks of seeds and hands the chunks
+to a process pool, most expensive first, so that the slow AIs do not end up running
+alone at the end of the tournament. With a single worker the chunks are played in
+this process instead.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Sequence
+
+from runner import GameResult, play_games
+from stats import Summary, summarize
+
+# The rough relative cost of one game for an AI, used to schedule the slowest cells
+# first; specs that are not listed cost 1.
+_SPEC_COSTS: dict[str, float] = {
+    "random": 0.1,
+    "intentional": 8,
+    "full": 8,
+    "full-with-mem": 8,
+    "full-detect-dead": 8,
+    "sample": 2500,  # sample(x) draws 5000 hands by default
+    "self": 1000,
+    "llm": 100000,
+}
+
+type Cell = tuple[str, str]
+
+
+def expected_cost(spec: str) -> float:
+    """
+    The rough relative cost of one game played by the AI described by `spec`.
+    """
+    if spec.startswith("sample(") and "," in spec:
+        return int(spec[7:-1].split(",")[1]) / 2
+    return _SPEC_COSTS.get(spec.split("(")[0], 1)
+
+
+def cross_play(
+    specs: Sequence[str],
+    seeds: Iterable[int],
+    workers: int = 1,
+    engine: str = "native",
+    chunk_size: int = 50,
+    confidence: float = 0.95,
+    progress: Callable[[Cell, int], None] | None = None,
+    decks: str | None = None,
+) -> dict[Cell, Summary]:
+    """
+    Play every ordered pair of `specs` (the first one is player 0) on every seed
+    and summarize each pair's scores.
+
+    With the native engine the deck is determined by the seed, so every cell is
+    evaluated on the same decks. HanaSim deals its own decks, so with that engine the
+    cells are only comparable on average. With `decks`, a deck corpus, seed n is
+    played on the deck with index n - 1. `progress`, if given, is called with the cell
+    and the number of its games finished after every chunk.
+    """
+    seeds = list(seeds)
+    cells: list[Cell] = [(a, b) for a in specs for b in specs]
+    chunks = [
+        (cell, seeds[i : i + chunk_size])
+        for cell in cells
+        for i in range(0, len(seeds), chunk_size)
+    ]
+    chunks.sort(key=lambda c: -(expected_cost(c[0][0]) + expected_cost(c[0][1])))
+
+    scores: dict[Cell, dict[int, int]] = {cell: {} for cell in cells}
+
+    def record(cell: Cell, results: Iterable[GameResult]) -> None:
+        for result in results:
+            scores[cell][result.seed] = result.score
+        if progress is not None:
+            progress(cell, len(scores[cell]))
+
+    if workers <= 1:
+        for cell, chunk in chunks:
+            record(cell, play_games(cell, chunk, engine, decks=decks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # the executor starts the chunks in the order they were submitted
+            futures = [
+                (cell, executor.submit(play_games, cell, chunk, engine, decks=decks))
+                for cell, chunk in chunks
+            ]
+            for cell, future in futures:
+                record(cell, future.result())
+
+    # sum in seed order, so that the statistics do not depend on the schedule
+    return {
+        cell: summarize((scores[cell][seed] for seed in seeds), confidence)
+        for cell in cells
+    }
+
+
+def format_matrix(specs: Sequence[str], summaries: dict[Cell, Summary]) -> str:
+    """
+    A table of the mean scores with their confidence intervals, with player 0 in
+    the rows and player 1 in the columns.
+    """
+    rows = [[""] + list(specs)]
+    for a in specs:
+        rows.append([a] + [str(summaries[a, b]) for b in specs])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows
+    )
@@ -0,0 +1,154 @@
+"""
+The view a player is given of its turn, see `TurnView`.
+"""
+
+from typing import Any, Callable, NamedTuple
+
+import numpy as np
+
+from utils import (
+    BoardMasks,
+    board_masks,
+    card_counts,
+    get_possible_mask,
+    highest_playable_cards,
+    unseen_counts,
+)
+
+
+class TurnArgs(NamedTuple):
+    """
+    The arguments of `Player.get_action`, in order.
+    """
+
+    nr: int
+    hands: Any
+    knowledge: Any
+    trash: Any
+    played: Any
+    board: Any
+    valid_actions: Any
+    hints: int
+
+
+class _fact:
+    """
+    A fact of a `TurnView`, derived from the arguments named in `depends`. It is
+    computed the first time it is asked for and then cached on the view. A view made
+    by `TurnView.replace` asks the view it was made from for the facts that do not
+    depend on the replaced arguments, so they are computed once for both.
+    """
+
+    def __init__(self, *depends: str) -> None:
+        self.depends = set(depends)
+
+    def __call__(self, compute: Callable[["TurnView"], Any]) -> "_fact":
+        self.compute = compute
+        self.__doc__ = compute.__doc__
+        return self
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, view: "TurnView | None", owner: type | None = None) -> Any:
+        if view is None:
+            return self
+        facts = view.__dict__
+        base = facts.get("_base")
+        if base is not None and not self.depends & facts["_replaced"]:
+            value = getattr(base, self.name)
+        else:
+            value = self.compute(view)
+        facts[self.name] = value
+        return value
+
+
+class TurnView(TurnArgs):
+    """
+    What a player is shown on its turn: the arguments of `Player.get_action`, which
+    unpack in the same order (so `player.get_action(*view)` works), and the facts
+    players derive from them. Each fact is computed the first time it is asked for
+    and then cached, so that a player, and the partners it simulates, only pay for it
+    once per turn. The arguments must not be modified while the view is in use.
+    """
+
+    @_fact("nr", "knowledge")
+    def possible_masks(self) -> list[int]:
+        """
+        The `get_possible_mask` of each card in the player's own hand.
+        """
+        return [get_possible_mask(k) for k in self.knowledge[self.nr]]
+
+    @_fact("board")
+    def masks(self) -> BoardMasks:
+        """
+        The `board_masks` of the board, ignoring dead colors.
+        """
+        return board_masks(self.board)
+
+    @_fact("board", "trash")
+    def dead_colors(self) -> dict:
+        """
+        The highest rank that can still be played of each color, see
+        `highest_playable_cards`.
+        """
+        return highest_playable_cards(self.board, self.trash)
+
+    @_fact("board", "trash")
+    def dead_masks(self) -> BoardMasks:
+        """
+        The `board_masks` of the board, taking dead colors into account.
+        """
+        return board_masks(self.board, self.dead_colors)
+
+    @_fact("board", "trash")
+    def trash_and_board_counts(self) -> list[int]:
+        """
+        The copies of each card id in the trash or on top of a stack of the board,
+        i.e. `card_counts(trash + board)`.
+        """
+        return card_counts(self.trash + self.board)
+
+    @_fact("board", "trash")
+    def unseen(self) -> np.ndarray:
+        """
+        The copies of each card id that are neither on the board nor in the trash,
+        see `unseen_counts`. Games that keep these counts up to date `provide` them.
+        """
+        return unseen_counts(self.board, self.trash)
+
+    @_fact("nr", "hands", "board")
+    def playables(self) -> list[tuple[int, int]]:
+        """
+        The (player, card) positions of the cards in the other players' hands that
+        can be played right now, in the order of the hands.
+        """
+        return [
+            (i, j)
+            for i, hand in enumerate(self.hands)
+            if i != self.nr
+            for j, (col, n) in enumerate(hand)
+            if self.board[col][1] + 1 == n
+        ]
+
+    def provide(self, **facts) -> "TurnView":
+        """
+        Give the view facts that are already known, e.g. counts that the game keeps
+        up to date, so that they are not computed. Returns the view.
+        """
+        for name, value in facts.items():
+            if not isinstance(getattr(type(self), name, None), _fact):
+                raise AttributeError(f"{name} is not a fact of a TurnView")
+            self.__dict__[name] = value
+        return self
+
+    def replace(self, **changes) -> "TurnView":
+        """
+        A view with some of the arguments replaced, which shares the facts that do
+        not depend on them with this view, e.g. to simulate a partner's turn for
+        several guesses of one hand.
+        """
+        view = self._replace(**changes)
+        view.__dict__["_base"] = self
+        view.__dict__["_replaced"] = set(changes)
+        return view
@@ -1,11 +1,21 @@
+import functools
+import itertools
 import random
-import copy
+import threading
+from collections import OrderedDict
 from enum import Enum, IntEnum, unique
-from typing import Final
+from typing import Final, NamedTuple
+
+import numpy as np
 
 COUNTS = [3, 2, 2, 2, 1]
 MAX_HINT_TOKENS: Final[int] = 8
 
+# The generator that games and players fall back to when they are not given one of
+# their own. It is shared by all of them, so give a game a seeded random.Random to
+# make it reproducible.
+GLOBAL_RNG: Final[random.Random] = random.Random()
+
 
 @unique
 class Color(IntEnum):
@@ -23,6 +33,70 @@ class Color(IntEnum):
         return str(self.value)
 
 
+_COLORS: Final[tuple[Color, ...]] = tuple(Color)
+
+# Besides as a (color, rank) tuple, a card can be identified by its id
+# color * 5 + rank - 1, which indexes arrays holding a count per card
+NUM_CARD_IDS: Final[int] = len(Color) * len(COUNTS)
+_CARDS: Final[tuple[tuple[Color, int], ...]] = tuple(
+    (col, rank) for col in Color for rank in range(1, len(COUNTS) + 1)
+)
+
+
+def card_id(card) -> int:
+    (col, num) = card
+    return col * 5 + num - 1
+
+
+def card_from_id(cid: int) -> tuple[Color, int]:
+    return _CARDS[cid]
+
+
+def card_counts(cards) -> list[int]:
+    """
+    Count the copies of each card id among `cards`. The (color, 0) entries of an
+    empty stack on the board are ignored, so `card_counts(trash + board)` works.
+    """
+    counts = [0] * NUM_CARD_IDS
+    for col, num in cards:
+        if num:
+            counts[col * 5 + num - 1] += 1
+    return counts
+
+
+# the number of copies of each card id in a full deck
+CARD_COPIES: Final[np.ndarray] = np.array(
+    [COUNTS[cid % len(COUNTS)] for cid in range(NUM_CARD_IDS)], dtype=np.int8
+)
+
+# the card ids of a full deck, sorted, e.g. to shuffle decks in bulk
+DECK_IDS: Final[np.ndarray] = np.repeat(
+    np.arange(NUM_CARD_IDS, dtype=np.int8), CARD_COPIES
+)
+DECK_SIZE: Final[int] = len(DECK_IDS)
+
+
+def unseen_counts(board, trash) -> np.ndarray:
+    """
+    The number of copies of each card id that are neither on the board nor in the
+    trash, i.e. that are still in the deck or in someone's hand.
+    """
+    unseen = CARD_COPIES - np.array(card_counts(trash), dtype=np.int8)
+    for col, num in board:
+        unseen[col * 5 : col * 5 + num] -= 1
+    return unseen
+
+
+def board_ranks(board) -> list[int]:
+    """
+    The rank on top of each color's stack, indexed by color.
+    """
+    ranks = [0] * len(Color)
+    for col, num in board:
+        ranks[col] = num
+    return ranks
+
+
 @unique
 class Intent(Enum):
     PLAY = 2
@@ -45,21 +119,54 @@ class Action:
         def __str__(self) -> str:
             return str(self.value)
 
+    __slots__ = ("action_type", "pnr", "col", "num", "cnr", "_hash")
+
     action_type: ActionType
+    pnr: int | None
+    col: Color | None
+    num: int | None
+    cnr: int | None  # card number (i.e. index)
+    _hash: int
 
-    def __init__(
-        self,
+    # every Action ever created, so that equal actions are the same object
+    _interned: dict[tuple, "Action"] = {}
+
+    def __new__(
+        cls,
         action_type: ActionType,
         pnr: int | None = None,
-        col: Color | None = None,
+        col: Color | int | None = None,
         num: int | None = None,
         cnr: int | None = None,
-    ) -> None:
-        self.action_type = action_type
-        self.pnr = pnr
-        self.col = col
-        self.num = num
-        self.cnr = cnr  # card number (i.e. index)
+    ) -> "Action":
+        if col is not None:
+            col = Color(col)
+        key = (action_type, pnr, col, num, cnr)
+        action = cls._interned.get(key)
+        if action is None:
+            action = object.__new__(cls)
+            for name, value in zip(Action.__slots__, key + (hash(key),)):
+                object.__setattr__(action, name, value)
+            cls._interned[key] = action
+        return action
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Action is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Action is immutable")
+
+    def __reduce__(self):
+        return Action, (self.action_type, self.pnr, self.col, self.num, self.cnr)
+
+    def __copy__(self) -> "Action":
+        return self
+
+    def __deepcopy__(self, memo) -> "Action":
+        return self
+
+    def __hash__(self) -> int:
+        return self._hash
 
     def __str__(self):
         if self.action_type == Action.ActionType.HINT_COLOR:
@@ -79,6 +186,10 @@ class Action:
             return "discards their " + str(self.cnr)
 
     def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Action):
+            return NotImplemented
         return (self.action_type, self.pnr, self.col, self.num, self.cnr) == (
             other.action_type,
             other.pnr,
@@ -100,13 +211,13 @@ def f(something):
     return something
 
 
-def make_deck():
+def make_deck(rng: random.Random = GLOBAL_RNG):
     deck = []
     for col in Color:
         for num, cnt in enumerate(COUNTS):
             for i in list(range(cnt)):
                 deck.append((col, num + 1))
-    random.shuffle(deck)
+    rng.shuffle(deck)
     return deck
 
 
@@ -127,25 +238,22 @@ def initial_knowledge():
 
 
 def hint_color(knowledge, color, truth):
-    result = []
-    for col in Color:
-        if truth == (col == color):
-            result.append(knowledge[col][:])
-        else:
-            result.append([0 for _ in knowledge[col]])
+    result = np.array(knowledge, dtype=np.int8)
+    if truth:
+        result[:color] = 0
+        result[color + 1 :] = 0
+    else:
+        result[color] = 0
     return result
 
 
 def hint_rank(knowledge, rank, truth):
-    result = []
-    for col in Color:
-        colknow = []
-        for i, k in enumerate(knowledge[col]):
-            if truth == (i + 1 == rank):
-                colknow.append(k)
-            else:
-                colknow.append(0)
-        result.append(colknow)
+    result = np.array(knowledge, dtype=np.int8)
+    if truth:
+        result[:, : rank - 1] = 0
+        result[:, rank:] = 0
+    else:
+        result[:, rank - 1] = 0
     return result
 
 
@@ -171,6 +279,9 @@ def get_possible(knowledge):
     """
     Get all the possible identities for a card given the current knowledge.
     """
+    if isinstance(knowledge, np.ndarray):
+        cols, ranks = np.nonzero(knowledge > 0)
+        return [(_COLORS[c], r + 1) for c, r in zip(cols.tolist(), ranks.tolist())]
     result = []
     for col in Color:
         for i, cnt in enumerate(knowledge[col]):
@@ -179,56 +290,169 @@ def get_possible(knowledge):
     return result
 
 
-def playable(possible, board, dead_colors=None):
+def get_possible_ids(knowledge) -> list[int]:
     """
-    Return True iff every possible identity for this card is playable.
+    Like `get_possible`, but return card ids.
+    """
+    if isinstance(knowledge, np.ndarray):
+        return np.flatnonzero(knowledge > 0).tolist()
+    return [
+        col * 5 + i for col in Color for i, cnt in enumerate(knowledge[col]) if cnt > 0
+    ]
+
+
+# The *_mask predicates below take the possible identities of a card as a bitmask,
+# with bit `card_id(card)` set for every card it may be (see `get_possible_mask`),
+# and the `BoardMasks` of the board, which have those bits set that belong to
+# playable and to discardable cards. Every predicate is then a single AND.
+
+_CARD_BITS: Final[np.ndarray] = np.array(
+    [1 << cid for cid in range(NUM_CARD_IDS)], dtype=np.int64
+)
+
+
+def get_possible_mask(knowledge) -> int:
+    """
+    Like `get_possible`, but return a bitmask of card ids.
+    """
+    if isinstance(knowledge, np.ndarray):
+        return int(np.dot(knowledge.reshape(-1) > 0, _CARD_BITS))
+    mask = 0
+    for col in Color:
+        for i, cnt in enumerate(knowledge[col]):
+            if cnt > 0:
+                mask |= 1 << (col * 5 + i)
+    return mask
+
+
+def card_mask(cards) -> int:
+    """
+    The bitmask of the card ids of `cards`.
+    """
+    mask = 0
+    for col, num in cards:
+        mask |= 1 << (col * 5 + num - 1)
+    return mask
+
+
+class BoardMasks(NamedTuple):
+    playable: int  # the cards that can be played next
+    discardable: int  # the cards that are no longer needed
+
+
+def _color_masks(col: int, rank: int, highest: int) -> BoardMasks:
+    """
+    The masks of the cards of color `col` when its stack is at `rank` and `highest`
+    is the highest rank that can still be played on it.
+    """
+    playable = 1 << (col * 5 + rank) if rank < highest else 0
+    discardable = 0
+    for r in range(5):
+        if r < rank or r >= highest:
+            discardable |= 1 << (col * 5 + r)
+    return BoardMasks(playable, discardable)
+
+
+# _COLOR_MASKS[col][rank][highest] for every color, stack rank and highest rank
+_COLOR_MASKS: Final[list[list[list[BoardMasks]]]] = [
+    [[_color_masks(col, rank, highest) for highest in range(6)] for rank in range(6)]
+    for col in Color
+]
+
+
+def _combine_masks(ranks, highest) -> BoardMasks:
+    playable = discardable = 0
+    for col, (rank, high) in enumerate(zip(ranks, highest)):
+        masks = _COLOR_MASKS[col][rank][high]
+        playable |= masks.playable
+        discardable |= masks.discardable
+    return BoardMasks(playable, discardable)
+
+
+# the masks of each of the 6^5 boards without dead colors, see board_index
+_BOARD_MASKS: Final[list[BoardMasks]] = [
+    _combine_masks(ranks, (5,) * len(Color))
+    for ranks in itertools.product(range(6), repeat=len(Color))
+]
+
+
+def board_index(board) -> int:
+    """
+    The number of the board in base 6, with the rank of color 0 as its most
+    significant digit.
+    """
+    index = 0
+    for _, num in board:
+        index = index * 6 + num
+    return index
+
+
+# there are too many combinations of boards and dead colors (6^10) to tabulate them
+# all, so those that occur are combined from the tables of the single colors
+@functools.lru_cache(maxsize=4096)
+def _dead_board_masks(ranks: tuple[int, ...], highest: tuple[int, ...]) -> BoardMasks:
+    return _combine_masks(ranks, highest)
+
+
+def board_masks(board, dead_colors=None) -> BoardMasks:
+    """
+    The masks of the playable and discardable cards on `board`, where
+    `dead_colors`, if given, maps every color to the highest rank that can still be
+    played on it (see `highest_playable_cards`).
     """
     if dead_colors is None:
-        dead_colors = {color: 5 for color in Color}
+        return _BOARD_MASKS[board_index(board)]
+    return _dead_board_masks(
+        tuple(num for _, num in board), tuple(dead_colors[col] for col in Color)
+    )
+
+
+def playable_mask(possible: int, masks: BoardMasks) -> bool:
+    return not possible & ~masks.playable
+
 
-    for col, nr in possible:
-        if board[col][1] + 1 != nr or nr > dead_colors[col]:
-            return False
-    return True
+def potentially_playable_mask(possible: int, masks: BoardMasks) -> bool:
+    return bool(possible & masks.playable)
+
+
+def discardable_mask(possible: int, masks: BoardMasks) -> bool:
+    return not possible & ~masks.discardable
+
+
+def potentially_discardable_mask(possible: int, masks: BoardMasks) -> bool:
+    return bool(possible & masks.discardable)
+
+
+def playable(possible, board, dead_colors=None):
+    """
+    Return True iff every possible identity for this card is playable.
+    """
+    return playable_mask(card_mask(possible), board_masks(board, dead_colors))
 
 
 def potentially_playable(possible, board, dead_colors=None):
     """
     Return True iff at least one possible identity for this card is playable.
     """
-    if dead_colors is None:
-        dead_colors = {color: 5 for color in Color}
-
-    for col, nr in possible:
-        if board[col][1] + 1 == nr and nr <= dead_colors[col]:
-            return True
-    return False
+    return potentially_playable_mask(
+        card_mask(possible), board_masks(board, dead_colors)
+    )
 
 
 def discardable(possible, board, dead_colors=None):
     """
     Return True iff every possible identity for this card is discardable.
     """
-    if dead_colors is None:
-        dead_colors = {color: 5 for color in Color}
-
-    for col, nr in possible:
-        if board[col][1] < nr and nr <= dead_colors[col]:
-            return False
-    return True
+    return discardable_mask(card_mask(possible), board_masks(board, dead_colors))
 
 
 def potentially_discardable(possible, board, dead_colors=None):
     """
     Return True iff at least one possible identity for this card is discardable.
     """
-    if dead_colors is None:
-        dead_colors = {color: 5 for color in Color}
-
-    for col, nr in possible:
-        if board[col][1] >= nr or nr > dead_colors[col]:
-            return True
-    return False
+    return potentially_discardable_mask(
+        card_mask(possible), board_masks(board, dead_colors)
+    )
 
 
 def format_intention(i: str | Intent | None) -> str:
@@ -247,9 +471,10 @@ def format_intention(i: str | Intent | None) -> str:
 
 
 def whattodo(knowledge, pointed, board, dead_colors=None) -> Action.ActionType | None:
-    possible = get_possible(knowledge)
-    play = potentially_playable(possible, board, dead_colors)
-    discard = potentially_discardable(possible, board, dead_colors)
+    possible = get_possible_mask(knowledge)
+    masks = board_masks(board, dead_colors)
+    play = potentially_playable_mask(possible, masks)
+    discard = potentially_discardable_mask(possible, masks)
 
     if play and pointed:
         return Action.ActionType.PLAY
@@ -258,6 +483,82 @@ def whattodo(knowledge, pointed, board, dead_colors=None) -> Action.ActionType |
     return None
 
 
+class LRUCache:
+    """
+    A cache of bounded size that evicts the least recently used entry first. It
+    counts its hits and misses, so that its size can be tuned; a `maxsize` of 0
+    turns it off. It may be shared by games running in several threads.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        The value stored for `key`, or None.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return (
+            f"LRUCache(hits={self.hits}, misses={self.misses}, "
+            f"size={len(self)}, maxsize={self.maxsize})"
+        )
+
+
+# The results of pretend, pretend_all (per hintee) and pretend_discard. Their keys
+# are fingerprints of everything the results depend on: a hint only depends on the
+# possible identities of the hintee's cards, not on how many copies of each are left.
+# In self-play about a quarter of the lookups hit, mostly entries from the same or
+# the previous turn. That pays off for the hints, but computing a discard's score
+# costs barely more than its key, so that cache is off unless given a size.
+PRETEND_CACHE = LRUCache(10000)
+PRETEND_ALL_CACHE = LRUCache(10000)
+PRETEND_DISCARD_CACHE = LRUCache(0)
+
+
+def _hand_fingerprint(knowledge, hand, intentions, board, dead_colors) -> tuple:
+    n = len(hand)
+    possible = np.dot(
+        np.asarray(knowledge, dtype=np.int8)[:n].reshape(n, NUM_CARD_IDS) > 0,
+        _CARD_BITS,
+    )
+    return (
+        tuple(possible.tolist()),
+        tuple(col * 5 + num - 1 for col, num in hand),
+        tuple(intentions),
+        tuple(num for _, num in board),
+        None if dead_colors is None else tuple(dead_colors[col] for col in Color),
+    )
+
+
 def pretend(action, knowledge, intentions, hand, board, trash, ignore_dead=False):
     """
     Pretend to give a hint and evaluates its effect on hand knowledge,
@@ -266,6 +567,21 @@ def pretend(action, knowledge, intentions, hand, board, trash, ignore_dead=False
     - tracks how much this hint would improve the player's future moves
     - predict what each player would likely do with their cards after receiving the hint
     """
+    dead_colors = highest_playable_cards(board, trash) if ignore_dead else None
+    if not PRETEND_CACHE.maxsize:
+        return _pretend(action, knowledge, intentions, hand, board, dead_colors)
+    key = (tuple(action),) + _hand_fingerprint(
+        knowledge, hand, intentions, board, dead_colors
+    )
+    result = PRETEND_CACHE.get(key)
+    if result is None:
+        result = _pretend(action, knowledge, intentions, hand, board, dead_colors)
+        PRETEND_CACHE.put(key, result)
+    (isvalid, score, predictions) = result
+    return isvalid, score, list(predictions)
+
+
+def _pretend(action, knowledge, intentions, hand, board, dead_colors):
     (action_type, value) = action
     positive = []
     haspositive = False
@@ -277,7 +593,7 @@ def pretend(action, knowledge, intentions, hand, board, trash, ignore_dead=False
             newknowledge.append(hint_color(knowledge[i], value, value == col))
             if value == col:
                 haspositive = True
-                if newknowledge[-1] != knowledge[i]:
+                if not np.array_equal(newknowledge[-1], knowledge[i]):
                     change = True
     else:
         newknowledge = []
@@ -287,23 +603,28 @@ def pretend(action, knowledge, intentions, hand, board, trash, ignore_dead=False
             newknowledge.append(hint_rank(knowledge[i], value, value == num))
             if value == num:
                 haspositive = True
-                if newknowledge[-1] != knowledge[i]:
+                if not np.array_equal(newknowledge[-1], knowledge[i]):
                     change = True
     if not haspositive:
         return False, 0, ["Invalid hint"]
     if not change:
         return False, 0, ["No new information"]
 
-    if ignore_dead:
-        dead_colors = highest_playable_cards(board, trash)
-    else:
-        dead_colors = None
+    predicted_actions = [
+        whattodo(k, p, board, dead_colors) for k, p in zip(newknowledge, positive)
+    ]
+    return _score_predictions(intentions, predicted_actions)
+
 
+def _score_predictions(intentions, predicted_actions):
+    """
+    Score what a player is predicted to do with their cards after a hint against
+    what the hinter intends them to do, as described in `pretend`.
+    """
     score = 0
     predictions: list[Intent | None] = []
     pos = False
-    for i, c, k, p in zip(intentions, hand, newknowledge, positive):
-        predicted_action = whattodo(k, p, board, dead_colors)
+    for i, predicted_action in zip(intentions, predicted_actions):
         if predicted_action == Action.ActionType.PLAY and i != Intent.PLAY:
             # print("would cause them to play", f(c))
             return False, 0, predictions + [Intent.PLAY]
@@ -336,32 +657,196 @@ def pretend(action, knowledge, intentions, hand, board, trash, ignore_dead=False
     return True, score, predictions
 
 
-def pretend_discard(act, knowledge, board, trash, ignore_dead=False, hint_value=0.5):
-    which = copy.deepcopy(knowledge[act.cnr])
-    for col, num in trash:
-        if which[col][num - 1]:
-            which[col][num - 1] -= 1
-    for col in Color:
-        for i in range(board[col][1]):
-            if which[col][i]:
-                which[col][i] -= 1
-    possibilities = sum(list(map(sum, which)))
-    expected = 0
-    terms = []
+# every hint that can be given to a player: the colors, then the ranks
+HINTS: Final[tuple[tuple[Action.ActionType, Color | int], ...]] = tuple(
+    (Action.ActionType.HINT_COLOR, col) for col in Color
+) + tuple((Action.ActionType.HINT_NUMBER, rank) for rank in range(1, 6))
+
+# _HINT_CELLS[h] selects the cells of a card's knowledge that hint HINTS[h] is about
+_HINT_CELLS: Final[np.ndarray] = np.zeros((len(HINTS), 5, 5), dtype=bool)
+for _c in range(5):
+    _HINT_CELLS[_c, _c, :] = True
+    _HINT_CELLS[5 + _c, :, _c] = True
+_HINT_CELLS.flags.writeable = False
+
+
+class HintPrediction(NamedTuple):
+    hintee: int
+    hint: tuple[Action.ActionType, Color | int]
+    # the values returned by `pretend` for the hint
+    valid: bool
+    score: int
+    predictions: list
+
+
+def pretend_all(
+    hands, knowledge, intentions, board, trash, hintees, ignore_dead=False
+) -> list[HintPrediction]:
+    """
+    Like `pretend`, but for every hint in HINTS to each of `hintees`, in that order.
+    The knowledge after each hint and the actions it would lead to are computed for
+    all hints to a player at once, on an array of their hand's knowledge.
+    """
     if ignore_dead:
         dead_colors = highest_playable_cards(board, trash)
     else:
-        dead_colors = {color: 5 for color in Color}
-    for col in Color:
-        for i, cnt in enumerate(which[col]):
-            rank = i + 1
+        dead_colors = None
+    masks = board_masks(board, dead_colors)
+
+    results = []
+    for hintee in hintees:
+        hand = hands[hintee]
+        k = np.asarray(knowledge[hintee], dtype=np.int8)[: len(hand)]
+        if not PRETEND_ALL_CACHE.maxsize:
+            predictions = _pretend_hints(k, hand, intentions, masks)
+        else:
+            key = _hand_fingerprint(k, hand, intentions, board, dead_colors)
+            predictions = PRETEND_ALL_CACHE.get(key)
+            if predictions is None:
+                predictions = _pretend_hints(k, hand, intentions, masks)
+                PRETEND_ALL_CACHE.put(key, predictions)
+        for hint, (isvalid, score, expl) in zip(HINTS, predictions):
+            results.append(HintPrediction(hintee, hint, isvalid, score, list(expl)))
+    return results
+
+
+def _pretend_hints(k, hand, intentions, masks):
+    """
+    `pretend` for every hint in HINTS to the player with `hand` and its knowledge
+    array `k`.
+    """
+    n = len(hand)
+    cols = np.array([col for col, _ in hand], dtype=np.int8)
+    ranks = np.array([num for _, num in hand], dtype=np.int8)
+    # positive[h, i] is whether hint h is about card i
+    positive = np.concatenate(
+        [
+            cols[None, :] == np.arange(5)[:, None],
+            ranks[None, :] == np.arange(1, 6)[:, None],
+        ]
+    )
+    touched = positive[:, :, None, None]
+    newknowledge = k * np.where(touched, _HINT_CELLS[:, None], ~_HINT_CELLS[:, None])
+    haspositive = positive.any(axis=1).tolist()
+    change = ((newknowledge != k) & touched).any(axis=(1, 2, 3)).tolist()
+    possible = np.dot(newknowledge.reshape(len(HINTS), n, NUM_CARD_IDS) > 0, _CARD_BITS)
+    # as in whattodo, a card that is pointed at is played or discarded
+    play = (positive & ((possible & masks.playable) != 0)).tolist()
+    discard = (positive & ((possible & masks.discardable) != 0)).tolist()
+
+    predictions = []
+    for h in range(len(HINTS)):
+        if not haspositive[h]:
+            predictions.append((False, 0, ["Invalid hint"]))
+        elif not change[h]:
+            predictions.append((False, 0, ["No new information"]))
+        else:
+            predicted_actions = [
+                Action.ActionType.PLAY
+                if p
+                else Action.ActionType.DISCARD
+                if d
+                else None
+                for p, d in zip(play[h], discard[h])
+            ]
+            predictions.append(_score_predictions(intentions, predicted_actions))
+    return predictions
+
+
+def format_hint(hint) -> str:
+    (action_type, value) = hint
+    if action_type == Action.ActionType.HINT_COLOR:
+        return "Hint Color " + Color(value).display_name
+    return "Hint Rank " + str(value)
+
+
+def pretend_discard(act, knowledge, board, trash, ignore_dead=False, hint_value=0.5):
+    if not PRETEND_DISCARD_CACHE.maxsize:
+        (expected, terms) = _pretend_discard(
+            knowledge[act.cnr], board, trash, ignore_dead, hint_value
+        )
+        return (act, expected, terms)
+    key = (
+        np.asarray(knowledge[act.cnr], dtype=np.int8).tobytes(),
+        tuple(card_counts(trash)),
+        tuple(num for _, num in board),
+        ignore_dead,
+        hint_value,
+    )
+    result = PRETEND_DISCARD_CACHE.get(key)
+    if result is None:
+        result = _pretend_discard(
+            knowledge[act.cnr], board, trash, ignore_dead, hint_value
+        )
+        PRETEND_DISCARD_CACHE.put(key, result)
+    (expected, terms) = result
+    return (act, expected, list(terms))
+
+
+def _pretend_discard(knowledge, board, trash, ignore_dead, hint_value):
+    dead_colors = highest_playable_cards(board, trash) if ignore_dead else None
+    [result] = discard_scores(
+        np.asarray(knowledge)[np.newaxis],
+        unseen_counts(board, trash),
+        board,
+        dead_colors,
+        hint_value,
+    )
+    return result
+
+
+def pretend_discards(
+    knowledge, board, trash, ignore_dead=False, hint_value=0.5, unseen=None
+):
+    """
+    `pretend_discard` for every card of a hand at once: a list with a (discard
+    action, expected value, terms) tuple per card. `unseen` may be passed in when it
+    is already known, e.g. from `TurnView.unseen`.
+    """
+    if unseen is None:
+        unseen = unseen_counts(board, trash)
+    dead_colors = highest_playable_cards(board, trash) if ignore_dead else None
+    scores = discard_scores(knowledge, unseen, board, dead_colors, hint_value)
+    return [
+        (Action(Action.ActionType.DISCARD, cnr=i), expected, terms)
+        for i, (expected, terms) in enumerate(scores)
+    ]
+
+
+def discard_scores(knowledge, unseen, board, dead_colors=None, hint_value=0.5):
+    """
+    The expected value of discarding each of the cards whose knowledge is stacked in
+    `knowledge`, as a list of (expected value, terms) pairs, where the terms are the
+    (color, rank, count, probability, value) contribution of each possible card.
+
+    A card is weighed by how many of its copies are still unseen, so the copies on
+    the board and in the trash (`CARD_COPIES - unseen`) are taken out of the
+    knowledge of all cards at once, as are the probabilities. Only the values of
+    the possible cards are then computed one by one, as their terms are listed.
+    """
+    which = np.asarray(knowledge, dtype=np.int16).reshape(-1, NUM_CARD_IDS) - (
+        CARD_COPIES - unseen
+    )
+    np.maximum(which, 0, out=which)
+    possibilities = which.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        probs = which / possibilities
+    ranks = board_ranks(board)
+    if dead_colors is None:
+        dead_colors = {col: 5 for col in Color}
+    scores = []
+    for counts, card_probs in zip(which.tolist(), probs.tolist()):
+        expected = 0
+        terms = []
+        for cid, cnt in enumerate(counts):
             if cnt > 0:
-                prob = cnt * 1.0 / possibilities
-                if board[col][1] >= rank or rank > dead_colors[col]:
+                (col, rank) = _CARDS[cid]
+                prob = card_probs[cid]
+                if ranks[col] >= rank or rank > dead_colors[col]:
                     expected += prob * hint_value
                     terms.append((col, rank, cnt, prob, prob * hint_value))
                 else:
-                    dist = rank - board[col][1]
+                    dist = rank - ranks[col]
                     if cnt > 1:
                         value = prob * (6 - rank) / (dist * dist)
                     else:
@@ -371,13 +856,15 @@ def pretend_discard(act, knowledge, board, trash, ignore_dead=False, hint_value=
                     value *= prob
                     expected -= value
                     terms.append((col, rank, cnt, prob, -value))
-    return (act, expected, terms)
+        scores.append((expected, terms))
+    return scores
 
 
 def format_knowledge(k):
     result = ""
+    rows = np.asarray(k).tolist()
     for col in Color:
-        for i, cnt in enumerate(k[col]):
+        for i, cnt in enumerate(rows[col]):
             if cnt > 0:
                 result += col.display_name + " " + str(i + 1) + ": " + str(cnt) + "\n"
     return result
@@ -392,18 +879,93 @@ def highest_playable_cards(board, trash):
     given the current discard pile.
     """
     dead_colors = {}
+    trashed = card_counts(trash)
     for col in Color:
         dead_colors[col] = 5  # Initialize all colors as possible to complete
         # For each color, find the highest rank that is still achievable
         for nr in range(board[col][1] + 1, 5 + 1):
             available = COUNTS[nr - 1]
-            used = trash.count((col, nr))
+            used = trashed[col * 5 + nr - 1]
             if available == used:
                 dead_colors[col] = nr - 1
                 break
     return dead_colors
 
 
+class CardTracker:
+    """
+    What the trash of a game says about the rest of it, kept up to date as cards are
+    trashed and untrashed instead of being recomputed from the whole trash:
+
+    - `dead_colors`: the highest rank that can still be played of each color, as
+      returned by `highest_playable_cards` (which does not depend on the board, as
+      the trash never holds all copies of a card that was played)
+    - `max_score`: the highest score that can still be reached
+    - `critical`: a `card_mask` of the critical cards, of which only one copy is
+      left outside the trash
+
+    A game updates its tracker in place, so whoever holds on to it can read it at
+    any time, but must not modify it.
+    """
+
+    def __init__(self, trash=()) -> None:
+        self.reset(trash)
+
+    def reset(self, trash=()) -> None:
+        self.trashed = card_counts(trash)
+        self.dead_colors = {col: self._highest(col) for col in Color}
+        self.max_score = sum(self.dead_colors.values())
+        self.critical = 0
+        for cid, used in enumerate(self.trashed):
+            if COUNTS[cid % 5] - used == 1:
+                self.critical |= 1 << cid
+
+    def _highest(self, col: Color) -> int:
+        for nr in range(1, 5 + 1):
+            if self.trashed[col * 5 + nr - 1] == COUNTS[nr - 1]:
+                return nr - 1
+        return 5
+
+    def trash(self, card) -> None:
+        (col, num) = card
+        cid = card_id(card)
+        self.trashed[cid] += 1
+        left = COUNTS[num - 1] - self.trashed[cid]
+        if left == 1:
+            self.critical |= 1 << cid
+        elif left == 0:
+            self.critical &= ~(1 << cid)
+            if num - 1 < self.dead_colors[col]:
+                self.max_score -= self.dead_colors[col] - (num - 1)
+                self.dead_colors[col] = num - 1
+
+    def untrash(self, card) -> None:
+        """
+        Take `card` back out of the trash, e.g. when a move is undone.
+        """
+        (col, num) = card
+        cid = card_id(card)
+        self.trashed[cid] -= 1
+        left = COUNTS[num - 1] - self.trashed[cid]
+        if left == 1:
+            self.critical |= 1 << cid
+            if self.dead_colors[col] == num - 1:
+                highest = self._highest(col)
+                self.max_score += highest - self.dead_colors[col]
+                self.dead_colors[col] = highest
+        elif left == 2:
+            self.critical &= ~(1 << cid)
+
+    def is_critical(self, card) -> bool:
+        return bool(self.critical >> card_id(card) & 1)
+
+    def __len__(self) -> int:
+        """
+        The number of cards in the trash.
+        """
+        return sum(self.trashed)
+
+
 class NullStream:
     def write(self, _):
         pass